@@ -1,15 +1,46 @@
+from contextlib import asynccontextmanager
 from http import HTTPStatus
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from sqlalchemy.exc import IntegrityError
 
-from fast_zero.routers import auth, todo, users
+from fast_zero.broker import broker
+from fast_zero.database import violates_foreign_key
+from fast_zero.replicas import PinRecentWriters
+from fast_zero.routers import auth, batch, internal, todo, users
 from fast_zero.schemas import Message
 
-app = FastAPI()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    await broker.close()
+
+
+app = FastAPI(lifespan=lifespan)
+app.add_middleware(PinRecentWriters)
+
+
+@app.exception_handler(IntegrityError)
+async def owner_gone(request: Request, error: IntegrityError):
+    # Only todo tables reference users; such a write means the token's
+    # user was deleted after the principal check let it through.
+    if not violates_foreign_key(error):
+        raise error
+
+    return JSONResponse(
+        status_code=HTTPStatus.UNAUTHORIZED,
+        content={'detail': 'Could not validate credentials'},
+        headers={'WWW-Authenticate': 'Bearer'},
+    )
+
 
 app.include_router(auth.router)
 app.include_router(todo.router)
+app.include_router(batch.router)
 app.include_router(users.router)
+app.include_router(internal.router)
 
 
 @app.get('/', status_code=HTTPStatus.OK, response_model=Message)
@@ -0,0 +1,142 @@
+import asyncio
+import contextlib
+from collections import defaultdict
+from contextlib import AbstractAsyncContextManager, asynccontextmanager
+from typing import Protocol
+
+import psycopg
+from sqlalchemy import make_url
+
+from fast_zero.database import settings
+
+NOTIFY_CHANNEL = 'todo_changes'
+
+
+class Broker(Protocol):
+    """Tells subscribers that a user's todos changed.
+
+    Messages carry no data: a woken subscriber reads what changed from
+    the change feed (fast_zero.revisions), so a coalesced or lost
+    wake-up delays an update but never drops it.
+    """
+
+    async def publish(self, user_id: int) -> None: ...
+
+    def subscribe(
+        self, user_id: int
+    ) -> AbstractAsyncContextManager[asyncio.Event]: ...
+
+    async def close(self) -> None: ...
+
+
+class MemoryBroker:
+    """Fans out within this process only."""
+
+    def __init__(self):
+        self._subscribers: dict[int, set] = defaultdict(set)
+
+    def wake(self, user_id: int):
+        # Publishers may run on another thread or event loop.
+        for loop, event in list(self._subscribers.get(user_id, ())):
+            loop.call_soon_threadsafe(event.set)
+
+    def wake_all(self):
+        for user_id in list(self._subscribers):
+            self.wake(user_id)
+
+    async def publish(self, user_id: int) -> None:
+        self.wake(user_id)
+
+    @asynccontextmanager
+    async def subscribe(self, user_id: int):
+        subscriber = (asyncio.get_running_loop(), asyncio.Event())
+        self._subscribers[user_id].add(subscriber)
+        try:
+            yield subscriber[1]
+        finally:
+            self._subscribers[user_id].discard(subscriber)
+            if not self._subscribers[user_id]:
+                del self._subscribers[user_id]
+
+    async def close(self) -> None:
+        pass
+
+
+class PostgresBroker(MemoryBroker):  # pragma: no cover
+    """Fans out across workers with LISTEN/NOTIFY on the primary.
+
+    Each worker keeps two connections outside the pool: one LISTENs and
+    wakes local subscribers, the other sends NOTIFY after commits.
+    """
+
+    def __init__(self, database_url: str, channel: str = NOTIFY_CHANNEL):
+        super().__init__()
+        self.conninfo = (
+            make_url(database_url)
+            .set(drivername='postgresql')
+            .render_as_string(hide_password=False)
+        )
+        self.channel = channel
+        self._listener: asyncio.Task | None = None
+        self._notifier: psycopg.AsyncConnection | None = None
+        self._notify_lock = asyncio.Lock()
+
+    async def _connect(self) -> psycopg.AsyncConnection:
+        return await psycopg.AsyncConnection.connect(
+            self.conninfo, autocommit=True
+        )
+
+    async def publish(self, user_id: int) -> None:
+        async with self._notify_lock:
+            try:
+                if self._notifier is None or self._notifier.closed:
+                    self._notifier = await self._connect()
+                await self._notifier.execute(
+                    'SELECT pg_notify(%s, %s)', (self.channel, str(user_id))
+                )
+            except psycopg.Error:
+                # The write is already committed; failing the request
+                # would only invite a retry. Subscribers catch up at
+                # their next keepalive.
+                self._notifier = None
+
+    async def _listen(self):
+        while True:
+            try:
+                async with await self._connect() as conn:
+                    await conn.execute(f'LISTEN {self.channel}')
+                    # Anything published while we were not listening.
+                    self.wake_all()
+                    async for notify in conn.notifies():
+                        self.wake(int(notify.payload))
+            except psycopg.Error:
+                await asyncio.sleep(1)
+
+    def subscribe(self, user_id: int):
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.create_task(self._listen())
+
+        return super().subscribe(user_id)
+
+    async def close(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._listener
+
+        if self._notifier is not None:
+            await self._notifier.close()
+
+
+def create_broker(database_url: str, kind: str) -> Broker:
+    if kind == 'postgres':  # pragma: no cover
+        return PostgresBroker(database_url)
+
+    return MemoryBroker()
+
+
+broker = create_broker(settings.DATABASE_URL, settings.TODO_BROKER)
+
+
+def get_broker() -> Broker:
+    return broker
@@ -0,0 +1,38 @@
+import hashlib
+import json
+from http import HTTPStatus
+
+from fastapi import Request, Response
+
+# Responses are per user: let clients revalidate, keep shared caches out.
+CACHE_CONTROL = 'private, no-cache'
+
+
+def make_etag(*parts) -> str:
+    payload = json.dumps(parts, separators=(',', ':'), default=str)
+    return f'"{hashlib.sha256(payload.encode()).hexdigest()[:32]}"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get('If-None-Match')
+    if not header:
+        return False
+
+    if header.strip() == '*':
+        return True
+
+    return etag in {
+        tag.strip().removeprefix('W/') for tag in header.split(',')
+    }
+
+
+def set_etag(response: Response, etag: str):
+    response.headers['ETag'] = etag
+    response.headers['Cache-Control'] = CACHE_CONTROL
+
+
+def not_modified(etag: str) -> Response:
+    response = Response(status_code=HTTPStatus.NOT_MODIFIED)
+    set_etag(response, etag)
+
+    return response
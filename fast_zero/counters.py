@@ -0,0 +1,71 @@
+from collections import Counter
+from collections.abc import Iterable
+
+from sqlalchemy import delete, func, insert, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from fast_zero.database import upsert
+from fast_zero.models import Todo, TodoCounter, TodoState
+
+
+def count_states(states: Iterable[TodoState], sign: int = 1) -> Counter:
+    deltas = Counter()
+    for state in states:
+        deltas[state] += sign
+
+    return deltas
+
+
+async def add_todo_counts(session: AsyncSession, user_id: int, deltas):
+    """Apply per-state deltas to the user's counters in one upsert, in
+    the caller's transaction so counters commit with the todos."""
+    rows = [
+        {'user_id': user_id, 'state': state, 'count': delta}
+        for state, delta in sorted(deltas.items())
+        if delta
+    ]
+    if not rows:
+        return
+
+    query = upsert(session, TodoCounter).values(rows)
+    query = query.on_conflict_do_update(
+        index_elements=[TodoCounter.user_id, TodoCounter.state],
+        set_={'count': TodoCounter.count + query.excluded.count},
+    )
+
+    await session.execute(query)
+
+
+async def cached_todo_total(
+    session: AsyncSession, user_id: int, state: TodoState | None = None
+) -> int:
+    query = select(func.coalesce(func.sum(TodoCounter.count), 0)).where(
+        TodoCounter.user_id == user_id
+    )
+    if state is not None:
+        query = query.where(TodoCounter.state == state)
+
+    return await session.scalar(query)
+
+
+async def rebuild_todo_counters(session: AsyncSession, user_id=None):
+    """Recount every user's todos (or only `user_id`'s) from scratch."""
+    if session.bind.dialect.name == 'postgresql':  # pragma: no cover
+        # Writers wait while the counters are rebuilt, so none of their
+        # deltas land on rows that are about to be replaced.
+        await session.execute(
+            text('LOCK TABLE todo_counters IN SHARE ROW EXCLUSIVE MODE')
+        )
+
+    counters = delete(TodoCounter)
+    todos = select(Todo.user_id, Todo.state, func.count()).group_by(
+        Todo.user_id, Todo.state
+    )
+    if user_id is not None:
+        counters = counters.where(TodoCounter.user_id == user_id)
+        todos = todos.where(Todo.user_id == user_id)
+
+    await session.execute(counters)
+    await session.execute(
+        insert(TodoCounter).from_select(['user_id', 'state', 'count'], todos)
+    )
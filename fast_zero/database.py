@@ -1,10 +1,161 @@
+import re
+import time
+from bisect import bisect_left
+from functools import partial
+
+from sqlalchemy import AsyncAdaptedQueuePool, event, make_url
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 
 from fast_zero.settings import Settings
 
-engine = create_async_engine(Settings().DATABASE_URL)
+WAIT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0)
+
+
+class PoolMetrics:
+    def __init__(self):
+        self.checkouts = 0
+        self.failures = 0
+        self.wait_sum = 0.0
+        self.wait_counts = [0] * (len(WAIT_BUCKETS) + 1)
+
+    def observe(self, seconds: float, *, failed: bool = False):
+        self.checkouts += 1
+        self.failures += failed
+        self.wait_sum += seconds
+        self.wait_counts[bisect_left(WAIT_BUCKETS, seconds)] += 1
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long each checkout waited and how
+    many failed, e.g. with `QueuePool limit ... overflow` timeouts."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        failed = True
+        try:
+            connection = super()._do_get()
+            failed = False
+            return connection
+        finally:
+            self.metrics.observe(time.perf_counter() - start, failed=failed)
+
+
+@event.listens_for(Engine, 'connect')
+def enable_sqlite_foreign_keys(dbapi_connection, connection_record):
+    """SQLite ignores foreign keys, ON DELETE CASCADE included, unless
+    each connection turns them on."""
+    if 'sqlite' in type(dbapi_connection).__module__:
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA foreign_keys=ON')
+        cursor.close()
+
+
+def create_engine(database_url: str, settings: Settings):
+    url = make_url(database_url)
+    connect_args = {}
+    if url.get_driver_name() == 'psycopg':
+        connect_args['prepare_threshold'] = settings.DATABASE_PREPARE_THRESHOLD
+
+    return create_async_engine(
+        url,
+        poolclass=InstrumentedPool,
+        pool_size=settings.DATABASE_POOL_SIZE,
+        max_overflow=settings.DATABASE_MAX_OVERFLOW,
+        pool_timeout=settings.DATABASE_POOL_TIMEOUT,
+        pool_recycle=settings.DATABASE_POOL_RECYCLE,
+        pool_pre_ping=settings.DATABASE_POOL_PRE_PING,
+        connect_args=connect_args,
+    )
+
+
+settings = Settings()
+engine = create_engine(settings.DATABASE_URL, settings)
+replica_engines = [
+    create_engine(url, settings) for url in settings.DATABASE_REPLICA_URLS
+]
 
 
 async def get_session():  # pragma: no cover
     async with AsyncSession(engine, expire_on_commit=False) as session:
         yield session
+
+
+def get_session_factory():  # pragma: no cover
+    """For responses that outlive the request's dependencies, such as
+    streaming bodies, which must open and close their own session."""
+    return partial(AsyncSession, engine, expire_on_commit=False)
+
+
+def pool_stats(pool: InstrumentedPool) -> dict:
+    metrics = pool.metrics
+    cumulative, buckets = 0, {}
+    for bound, count in zip(
+        (*map(str, WAIT_BUCKETS), '+Inf'), metrics.wait_counts
+    ):
+        cumulative += count
+        buckets[bound] = cumulative
+
+    return {
+        'size': pool.size(),
+        'checked_out': pool.checkedout(),
+        'idle': pool.checkedin(),
+        'overflow': max(pool.overflow(), 0),
+        'checkouts': metrics.checkouts,
+        'failures': metrics.failures,
+        'wait_seconds': {
+            'buckets': buckets,
+            'count': metrics.checkouts,
+            'sum': metrics.wait_sum,
+        },
+    }
+
+
+def upsert(session: AsyncSession, model):
+    """INSERT for `model` with the session's dialect, so the statement
+    has on_conflict_do_update (Postgres and SQLite only)."""
+    if session.bind.dialect.name == 'postgresql':
+        return postgresql.insert(model)
+
+    return sqlite.insert(model)
+
+
+FOREIGN_KEY_VIOLATION = '23503'
+SQLITE_UNIQUE = re.compile(
+    r"UNIQUE constraint failed: (?:index '(?P<index>\w+)'|"
+    r'(?P<table>\w+)\.(?P<column>\w+))'
+)
+
+
+def violated_constraint(error: IntegrityError) -> str | None:
+    """Name of the constraint `error` tripped over. SQLite only reports
+    the column of an unnamed unique constraint, so that case is mapped
+    to the name Postgres gives it (`<table>_<column>_key`)."""
+    diag = getattr(error.orig, 'diag', None)
+    if diag is not None:  # pragma: no cover
+        return diag.constraint_name
+
+    match = SQLITE_UNIQUE.search(str(error.orig))
+    if match is None:
+        return None
+
+    if match['index']:
+        return match['index']
+
+    return f'{match["table"]}_{match["column"]}_key'
+
+
+def violates_foreign_key(error: IntegrityError) -> bool:
+    """Whether `error` is a row pointing at a parent that is gone, e.g. a
+    todo written for a user deleted while the request was running."""
+    sqlstate = getattr(error.orig, 'sqlstate', None)
+    if sqlstate is not None:  # pragma: no cover
+        return sqlstate == FOREIGN_KEY_VIOLATION
+
+    return 'FOREIGN KEY constraint failed' in str(error.orig)
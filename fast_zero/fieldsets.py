@@ -0,0 +1,59 @@
+from functools import cache
+from http import HTTPStatus
+from typing import Annotated, NotRequired, TypedDict
+
+from fastapi import HTTPException, Query
+from pydantic import BaseModel, TypeAdapter
+
+from fast_zero.schemas import TodoPublic, Total, UserPublic
+
+T_Fields = Annotated[str | None, Query(examples=['id,state'])]
+
+
+def parse_fields(fields: str | None, schema: type[BaseModel]):
+    """The fields of `schema` named in the comma-separated `fields`, in
+    schema order and always with `id`; all of them when `fields` is
+    None."""
+    if fields is None:
+        return tuple(schema.model_fields)
+
+    requested = {field.strip() for field in fields.split(',')} - {''}
+    unknown = requested - schema.model_fields.keys()
+    if unknown:
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail=f'Unknown fields: {", ".join(sorted(unknown))}',
+        )
+
+    requested.add('id')
+
+    return tuple(field for field in schema.model_fields if field in requested)
+
+
+def todo_fields(fields: T_Fields = None) -> tuple[str, ...]:
+    return parse_fields(fields, TodoPublic)
+
+
+def user_fields(fields: T_Fields = None) -> tuple[str, ...]:
+    return parse_fields(fields, UserPublic)
+
+
+@cache
+def list_adapter(row: type, key: str, fields: tuple[str, ...]):
+    """Serializer for `{key: [rows], 'next_cursor': ..., 'total': ...}`
+    pages whose rows hold only `fields` of the `row` TypedDict; `total`
+    is optional. Building a TypeAdapter is slow, so each field set gets
+    one, on first use."""
+    partial_row = TypedDict(
+        row.__name__, {field: row.__annotations__[field] for field in fields}
+    )
+    page = TypedDict(
+        f'{row.__name__}Page',
+        {
+            key: list[partial_row],
+            'next_cursor': str | None,
+            'total': NotRequired[Total],
+        },
+    )
+
+    return TypeAdapter(page)
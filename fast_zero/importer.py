@@ -0,0 +1,242 @@
+import codecs
+import csv
+from collections.abc import AsyncIterable, AsyncIterator
+from http import HTTPStatus
+
+from fastapi import HTTPException
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.util import await_only, greenlet_spawn
+
+from fast_zero.counters import add_todo_counts, count_states
+from fast_zero.models import Todo
+from fast_zero.revisions import next_todo_revision
+from fast_zero.schemas import (
+    TodoImportError,
+    TodoImportResult,
+    TodoSchema,
+    describe_errors,
+)
+
+IMPORT_BATCH_SIZE = 5000
+IMPORT_MAX_ERRORS = 100
+# Bounds the memory a single line (or CSV field) can take while it is
+# still being received.
+IMPORT_MAX_LINE_LENGTH = 1 << 20
+
+# The csv module's default of 128 KiB per field is below what a
+# description may hold.
+csv.field_size_limit(IMPORT_MAX_LINE_LENGTH)
+
+T_Rows = AsyncIterator[tuple[int, TodoSchema | str]]
+
+
+def _line_too_long(number: int) -> HTTPException:
+    return HTTPException(
+        status_code=HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+        detail=(
+            f'Line {number} is longer than {IMPORT_MAX_LINE_LENGTH} characters'
+        ),
+    )
+
+
+async def _lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[str]:
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    # Pieces of the line still waiting for its newline, joined once it
+    # arrives rather than copied again with every chunk.
+    pending, pending_length, number = [], 0, 0
+
+    try:
+        async for chunk in chunks:
+            *lines, tail = decoder.decode(chunk).split('\n')
+            if lines:
+                lines[0] = ''.join((*pending, lines[0]))
+                pending, pending_length = [], 0
+
+            for line in lines:
+                number += 1
+                if len(line) > IMPORT_MAX_LINE_LENGTH:
+                    raise _line_too_long(number)
+                yield line
+
+            pending.append(tail)
+            pending_length += len(tail)
+            if pending_length > IMPORT_MAX_LINE_LENGTH:
+                raise _line_too_long(number + 1)
+
+        pending.append(decoder.decode(b'', final=True))
+    except UnicodeDecodeError:
+        raise HTTPException(
+            status_code=HTTPStatus.BAD_REQUEST,
+            detail='Request body is not valid UTF-8',
+        )
+
+    line = ''.join(pending)
+    if len(line) > IMPORT_MAX_LINE_LENGTH:
+        raise _line_too_long(number + 1)
+    if line:
+        yield line
+
+
+async def _ndjson_rows(chunks: AsyncIterable[bytes]) -> T_Rows:
+    number = 0
+    async for line in _lines(chunks):
+        number += 1
+        if not line.strip():
+            continue
+
+        try:
+            yield number, TodoSchema.model_validate_json(line)
+        except ValidationError as error:
+            yield number, describe_errors(error, 'row')
+
+
+async def _csv_records(chunks: AsyncIterable[bytes]):
+    """One csv.reader over the whole body, so quoting follows the csv
+    module's rules alone. The reader pulls lines synchronously; running
+    each `next` in a greenlet lets it wait for the next line mid-record.
+    Yields each record's first line number and its values, or None for
+    a quoted field still open at the end of the body."""
+    lines = _lines(chunks)
+    ended = False
+
+    def pull():
+        nonlocal ended
+        while True:
+            try:
+                # csv keeps the line break inside a quoted field.
+                yield await_only(lines.__anext__()) + '\n'
+            except StopAsyncIteration:
+                ended = True
+                return
+
+    reader = csv.reader(pull())
+    start = 1
+    while not ended:
+        try:
+            values = await greenlet_spawn(next, reader, None)
+        except csv.Error as error:
+            # The reader can't resync after this, so the upload stops.
+            raise HTTPException(
+                status_code=HTTPStatus.BAD_REQUEST,
+                detail=f'Line {reader.line_num}: {error}',
+            )
+
+        if values is None:
+            return
+
+        # The last line ends a record without asking for more, so the
+        # body only runs out inside a record when a quote is unclosed.
+        if ended:
+            yield start, None
+        elif any(value.strip() for value in values):
+            yield start, values
+
+        start = reader.line_num + 1
+
+
+async def _csv_rows(chunks: AsyncIterable[bytes]) -> T_Rows:
+    header = None
+    async for number, values in _csv_records(chunks):
+        if values is None:
+            yield number, 'row: Unterminated quoted field'
+        elif header is None:
+            header = [name.strip() for name in values]
+        elif len(values) != len(header):
+            yield number, f'row: Expected {len(header)} columns'
+        else:
+            try:
+                yield (
+                    number,
+                    TodoSchema.model_validate(dict(zip(header, values))),
+                )
+            except ValidationError as error:
+                yield number, describe_errors(error, 'row')
+
+
+async def _insert_todos(
+    session: AsyncSession, user_id: int, todos, revision: int
+):
+    await session.execute(
+        insert(Todo),
+        [
+            {**todo.model_dump(), 'user_id': user_id, 'revision': revision}
+            for todo in todos
+        ],
+    )
+
+
+async def _copy_todos(
+    session: AsyncSession, user_id: int, todos, revision: int
+):  # pragma: no cover
+    connection = await session.connection()
+    raw = await connection.get_raw_connection()
+
+    async with raw.driver_connection.cursor() as cursor:
+        async with cursor.copy(
+            'COPY todos (user_id, title, description, state, revision) '
+            'FROM STDIN'
+        ) as copy:
+            for todo in todos:
+                await copy.write_row((
+                    user_id,
+                    todo.title,
+                    todo.description,
+                    todo.state.value,
+                    revision,
+                ))
+
+
+async def _batches(rows: T_Rows, result: TodoImportResult):
+    batch = []
+    async for number, todo in rows:
+        if isinstance(todo, str):
+            result.rejected += 1
+            if len(result.errors) < IMPORT_MAX_ERRORS:
+                result.errors.append(TodoImportError(line=number, detail=todo))
+            continue
+
+        batch.append(todo)
+        if len(batch) == IMPORT_BATCH_SIZE:
+            yield batch
+            batch = []
+
+    if batch:
+        yield batch
+
+
+async def import_todos(
+    session: AsyncSession,
+    user_id: int,
+    chunks: AsyncIterable[bytes],
+    import_format: str,
+) -> TodoImportResult:
+    """Validate rows as they arrive and write them in batches, so the
+    upload is never held in memory. Postgres loads each batch with COPY,
+    other backends with a multi-row INSERT. Rejected rows are reported
+    (the first `IMPORT_MAX_ERRORS` of them in detail) and skipped.
+
+    Each batch commits on its own, with its own revision, so the user's
+    todo_revisions row is only locked while a batch is written rather
+    than for the whole upload. Batches committed before an upload fails
+    partway (say, on invalid UTF-8) stay imported."""
+    rows = (
+        _csv_rows(chunks) if import_format == 'csv' else _ndjson_rows(chunks)
+    )
+    if session.bind.dialect.name == 'postgresql':
+        write = _copy_todos
+    else:
+        write = _insert_todos
+
+    result = TodoImportResult()
+    async for batch in _batches(rows, result):
+        revision = await next_todo_revision(session, user_id)
+        await write(session, user_id, batch, revision)
+        await add_todo_counts(
+            session, user_id, count_states(todo.state for todo in batch)
+        )
+        await session.commit()
+        result.accepted += len(batch)
+
+    return result
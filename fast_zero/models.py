@@ -1,11 +1,23 @@
 from datetime import datetime
 from enum import Enum
 
-from sqlalchemy import ForeignKey, func
+from sqlalchemy import (
+    DDL,
+    ForeignKey,
+    Index,
+    String,
+    event,
+    func,
+    literal_column,
+)
 from sqlalchemy.orm import Mapped, mapped_column, registry, relationship
 
 table_registry = registry()
 
+# Longest title accepted on input. Titles are indexed for sorting; keep
+# every entry well inside a btree page.
+TITLE_MAX_LENGTH = 500
+
 
 class TodoState(str, Enum):
     draft = 'draft'
@@ -18,11 +30,15 @@ class TodoState(str, Enum):
 @table_registry.mapped_as_dataclass
 class User:
     __tablename__ = 'users'
+    __mapper_args__ = {'eager_defaults': True}
 
     id: Mapped[int] = mapped_column(init=False, primary_key=True)
     username: Mapped[str] = mapped_column(unique=True)
     password: Mapped[str]
     email: Mapped[str] = mapped_column(unique=True)
+    token_version: Mapped[int] = mapped_column(
+        init=False, default=0, server_default='0'
+    )
     created_at: Mapped[datetime] = mapped_column(
         init=False, server_default=func.now()
     )
@@ -32,23 +48,187 @@ class User:
         onupdate=func.now(),
     )
 
+    # The database deletes a user's todos (ON DELETE CASCADE); the ORM
+    # never loads them just to delete them one by one.
     todos: Mapped[list['Todo']] = relationship(
-        init=False, cascade='all, delete-orphan', lazy='selectin'
+        init=False,
+        cascade='all, delete-orphan',
+        lazy='raise',
+        passive_deletes=True,
     )
 
 
 @table_registry.mapped_as_dataclass
 class Todo:
     __tablename__ = 'todos'
+    __mapper_args__ = {'eager_defaults': True}
 
     id: Mapped[int] = mapped_column(init=False, primary_key=True)
-    user_id: Mapped[int] = mapped_column(ForeignKey('users.id'))
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey('users.id', ondelete='CASCADE')
+    )
     title: Mapped[str]
     description: Mapped[str]
     state: Mapped[TodoState]
+    # The user's todo revision at this todo's last write; see
+    # fast_zero.revisions.
+    revision: Mapped[int] = mapped_column(default=0, server_default='0')
     created_at: Mapped[datetime] = mapped_column(
         init=False, server_default=func.now()
     )
     updated_at: Mapped[datetime] = mapped_column(
         init=False, server_default=func.now(), onupdate=func.now()
     )
+
+
+@table_registry.mapped_as_dataclass
+class TodoCounter:
+    """How many todos a user has in each state, kept in step by every
+    write path in the todo router (see fast_zero.counters)."""
+
+    __tablename__ = 'todo_counters'
+
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey('users.id', ondelete='CASCADE'), primary_key=True
+    )
+    state: Mapped[TodoState] = mapped_column(primary_key=True)
+    count: Mapped[int] = mapped_column(default=0, server_default='0')
+
+
+@table_registry.mapped_as_dataclass
+class TodoRevision:
+    """A user's todo high-water mark, bumped by every write to their
+    todos."""
+
+    __tablename__ = 'todo_revisions'
+
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey('users.id', ondelete='CASCADE'), primary_key=True
+    )
+    revision: Mapped[int] = mapped_column(default=0, server_default='0')
+
+
+@table_registry.mapped_as_dataclass
+class TodoTombstone:
+    """Records a deleted todo so sync clients can drop it."""
+
+    __tablename__ = 'todo_tombstones'
+
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey('users.id', ondelete='CASCADE'), primary_key=True
+    )
+    revision: Mapped[int] = mapped_column(primary_key=True)
+    todo_id: Mapped[int] = mapped_column(primary_key=True)
+
+
+# Emails are unique regardless of case; login looks them up by lower().
+Index('uq_users_email_lower', func.lower(User.email), unique=True)
+
+Index('ix_todos_user_id_id', Todo.user_id, Todo.id)
+
+Index('ix_todos_user_id_revision_id', Todo.user_id, Todo.revision, Todo.id)
+
+
+def todo_title_sort_key():
+    """The title as `ix_todos_user_id_title_id` indexes it.
+
+    Todos from before TITLE_MAX_LENGTH may hold titles too long for a
+    btree entry, so only their first TITLE_MAX_LENGTH characters are
+    indexed, and they sort by that prefix, then by id. The literals are
+    inlined for the planner to match queries against the index.
+    """
+    return func.substr(
+        Todo.title,
+        literal_column('1'),
+        literal_column(str(TITLE_MAX_LENGTH)),
+        type_=String,
+    )
+
+
+# One per GET /todos/ order_by, each ending in id for the keyset cursor.
+# The state index also serves state filters ordered by id.
+Index('ix_todos_user_id_created_at_id', Todo.user_id, Todo.created_at, Todo.id)
+
+Index('ix_todos_user_id_updated_at_id', Todo.user_id, Todo.updated_at, Todo.id)
+
+Index(
+    'ix_todos_user_id_title_id', Todo.user_id, todo_title_sort_key(), Todo.id
+)
+
+Index('ix_todos_user_id_state_id', Todo.user_id, Todo.state, Todo.id)
+
+
+def todo_search_document():
+    """The tsvector the Postgres full-text index is built on.
+
+    Queries must use this exact expression for the planner to match it
+    against `ix_todos_search`, hence the inlined literals.
+    """
+    return func.to_tsvector(
+        literal_column("'simple'"),
+        Todo.title + literal_column("' '") + Todo.description,
+    )
+
+
+Index(
+    'ix_todos_search',
+    Todo.user_id,
+    todo_search_document(),
+    postgresql_using='gin',
+).ddl_if(dialect='postgresql')
+
+Index(
+    'ix_todos_title_trgm',
+    Todo.user_id,
+    Todo.title,
+    postgresql_using='gin',
+    postgresql_ops={'title': 'gin_trgm_ops'},
+).ddl_if(dialect='postgresql')
+
+Index(
+    'ix_todos_description_trgm',
+    Todo.user_id,
+    Todo.description,
+    postgresql_using='gin',
+    postgresql_ops={'description': 'gin_trgm_ops'},
+).ddl_if(dialect='postgresql')
+
+for extension in ('pg_trgm', 'btree_gin'):
+    event.listen(
+        table_registry.metadata,
+        'before_create',
+        DDL(f'CREATE EXTENSION IF NOT EXISTS {extension}').execute_if(
+            dialect='postgresql'
+        ),
+    )
+
+# SQLite has no GIN; keep an FTS5 index of todos in sync through triggers.
+SQLITE_TODOS_FTS = [
+    'CREATE VIRTUAL TABLE todos_fts USING fts5('
+    "title, description, content='todos', content_rowid='id')",
+    'CREATE TRIGGER todos_fts_ai AFTER INSERT ON todos BEGIN '
+    'INSERT INTO todos_fts(rowid, title, description) '
+    'VALUES (new.id, new.title, new.description); END',
+    'CREATE TRIGGER todos_fts_ad AFTER DELETE ON todos BEGIN '
+    'INSERT INTO todos_fts(todos_fts, rowid, title, description) '
+    "VALUES ('delete', old.id, old.title, old.description); END",
+    'CREATE TRIGGER todos_fts_au AFTER UPDATE OF title, description '
+    'ON todos BEGIN '
+    'INSERT INTO todos_fts(todos_fts, rowid, title, description) '
+    "VALUES ('delete', old.id, old.title, old.description); "
+    'INSERT INTO todos_fts(rowid, title, description) '
+    'VALUES (new.id, new.title, new.description); END',
+]
+
+for statement in SQLITE_TODOS_FTS:
+    event.listen(
+        Todo.__table__,
+        'after_create',
+        DDL(statement).execute_if(dialect='sqlite'),
+    )
+
+event.listen(
+    Todo.__table__,
+    'after_drop',
+    DDL('DROP TABLE IF EXISTS todos_fts').execute_if(dialect='sqlite'),
+)
@@ -0,0 +1,81 @@
+import base64
+import binascii
+import json
+from collections.abc import Callable, Sequence
+from datetime import datetime
+from http import HTTPStatus
+from typing import Any
+
+from fastapi import HTTPException
+from sqlalchemy import Select, tuple_
+
+from fast_zero.schemas import FilterPage
+
+
+def encode_cursor(values: Sequence) -> str:
+    payload = json.dumps(list(values), separators=(',', ':'), default=str)
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def _coerce(key, value):
+    python_type = key.type.python_type
+    if python_type is datetime:
+        return datetime.fromisoformat(value)
+
+    return python_type(value)
+
+
+def decode_cursor(cursor: str, keys: Sequence) -> list:
+    invalid_cursor = HTTPException(
+        status_code=HTTPStatus.BAD_REQUEST, detail='Invalid cursor'
+    )
+
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise invalid_cursor
+
+    if not isinstance(values, list) or len(values) != len(keys):
+        raise invalid_cursor
+
+    try:
+        return [_coerce(key, value) for key, value in zip(keys, values)]
+    except (TypeError, ValueError):
+        raise invalid_cursor
+
+
+def paginate(
+    query: Select,
+    keys: Sequence,
+    page: FilterPage,
+    *,
+    descending: bool = False,
+) -> Select:
+    """Order by `keys` and seek past `page.cursor` instead of scanning
+    every skipped row. One extra row is fetched to detect a next page."""
+    if page.cursor is not None:
+        values = decode_cursor(page.cursor, keys)
+        position = keys[0] if len(keys) == 1 else tuple_(*keys)
+        after = values[0] if len(keys) == 1 else tuple_(*values)
+        query = query.where(
+            position < after if descending else position > after
+        )
+
+    order = [key.desc() for key in keys] if descending else keys
+
+    return query.order_by(*order).offset(page.offset).limit(page.limit + 1)
+
+
+def page_results(
+    rows: Sequence, page: FilterPage, cursor_of: Callable[[Any], Sequence]
+):
+    """Trim the look-ahead row and build the cursor for the next page
+    from the key values `cursor_of` reads off the last row kept."""
+    rows = list(rows)
+    if len(rows) <= page.limit or page.limit == 0:
+        return rows[: page.limit], None
+
+    rows = rows[: page.limit]
+
+    return rows, encode_cursor(cursor_of(rows[-1]))
@@ -0,0 +1,147 @@
+import itertools
+from collections.abc import Sequence
+from datetime import datetime, timedelta, timezone
+from http import HTTPStatus
+from http.cookies import SimpleCookie
+from math import ceil
+
+from fastapi import HTTPException, Request
+from fastapi.security.utils import get_authorization_scheme_param
+from jwt import decode, encode
+from jwt.exceptions import PyJWTError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from fast_zero.database import engine, replica_engines, settings
+from fast_zero.security import decode_principal
+
+SAFE_METHODS = {'GET', 'HEAD', 'OPTIONS'}
+
+
+class ReplicaSelector:
+    def __init__(self, engines: Sequence[AsyncEngine], strategy: str):
+        self.engines = list(engines)
+        self.strategy = strategy
+        self._cycle = itertools.cycle(self.engines)
+
+    def choose(self) -> AsyncEngine:
+        if self.strategy == 'least_connections':
+            return min(self.engines, key=lambda e: e.pool.checkedout())
+
+        return next(self._cycle)
+
+
+replica_selector = ReplicaSelector(
+    replica_engines, settings.DATABASE_REPLICA_STRATEGY
+)
+
+# Pins travel with the client rather than living in one worker: a short
+# lived token, signed like access tokens, sent back as a cookie or header.
+PIN_COOKIE = 'read_your_writes'
+PIN_HEADER = 'X-Read-Your-Writes'
+
+
+def pin_token(user_id: int) -> str:
+    expire = datetime.now(tz=timezone.utc) + timedelta(
+        seconds=settings.READ_YOUR_WRITES_SECONDS
+    )
+
+    return encode(
+        {'pin': user_id, 'exp': expire},
+        settings.SECRET_KEY,
+        settings.ALGORITHM,
+    )
+
+
+def is_pinned(request: Request) -> bool:
+    pin = request.headers.get(PIN_HEADER) or request.cookies.get(PIN_COOKIE)
+    user_id = request_user_id(request)
+    if not pin or user_id is None:
+        return False
+
+    try:
+        payload = decode(
+            pin, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
+        )
+    except PyJWTError:
+        return False
+
+    return payload.get('pin') == user_id
+
+
+def request_user_id(request: Request) -> int | None:
+    scheme, token = get_authorization_scheme_param(
+        request.headers.get('Authorization')
+    )
+    if scheme.lower() != 'bearer' or not token:
+        return None
+
+    try:
+        return decode_principal(token).id
+    except HTTPException:
+        return None
+
+
+def read_engine(pinned: bool) -> AsyncEngine:
+    if not replica_selector.engines or pinned:
+        return engine
+
+    return replica_selector.choose()
+
+
+async def get_read_session(request: Request):  # pragma: no cover
+    """Session for read-only routes: a replica when any are configured,
+    the primary for clients holding a pin from a write made within
+    READ_YOUR_WRITES_SECONDS."""
+    async with AsyncSession(
+        read_engine(is_pinned(request)), expire_on_commit=False
+    ) as session:
+        yield session
+
+
+def _pin_cookie(pin: str) -> str:
+    cookie = SimpleCookie()
+    cookie[PIN_COOKIE] = pin
+    cookie[PIN_COOKIE]['max-age'] = ceil(settings.READ_YOUR_WRITES_SECONDS)
+    cookie[PIN_COOKIE]['path'] = '/'
+    cookie[PIN_COOKIE]['httponly'] = True
+    cookie[PIN_COOKIE]['samesite'] = 'lax'
+
+    return cookie.output(header='').strip()
+
+
+class PinRecentWriters:
+    """Hand a pin to the client of every successful write.
+
+    A plain ASGI middleware: reads pass straight through, and a write's
+    response only gains two headers, so streamed bodies are untouched.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if (
+            scope['type'] != 'http'
+            or scope['method'] in SAFE_METHODS
+            or not replica_selector.engines
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_pin(message: Message):
+            if (
+                message['type'] == 'http.response.start'
+                and message['status'] < HTTPStatus.BAD_REQUEST
+            ):
+                user_id = request_user_id(Request(scope))
+                if user_id is not None:
+                    pin = pin_token(user_id)
+                    headers = MutableHeaders(scope=message)
+                    headers.append(PIN_HEADER, pin)
+                    headers.append('set-cookie', _pin_cookie(pin))
+
+            await send(message)
+
+        await self.app(scope, receive, send_with_pin)
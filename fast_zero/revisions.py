@@ -0,0 +1,102 @@
+from collections.abc import Iterable
+
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from fast_zero.database import upsert
+from fast_zero.models import Todo, TodoRevision, TodoTombstone
+from fast_zero.pagination import encode_cursor, paginate
+from fast_zero.schemas import FilterPage
+
+
+async def next_todo_revision(session: AsyncSession, user_id: int) -> int:
+    """Bump and return the user's todo revision.
+
+    The upsert locks the user's row until the transaction ends, so two
+    writes by the same user commit in revision order and a client that
+    synced up to revision N can never miss a later commit below N.
+    """
+    query = upsert(session, TodoRevision).values(user_id=user_id, revision=1)
+    query = query.on_conflict_do_update(
+        index_elements=[TodoRevision.user_id],
+        set_={'revision': TodoRevision.revision + 1},
+    ).returning(TodoRevision.revision)
+
+    return await session.scalar(query)
+
+
+async def current_todo_revision(session: AsyncSession, user_id: int) -> int:
+    revision = await session.scalar(
+        select(TodoRevision.revision).where(TodoRevision.user_id == user_id)
+    )
+
+    return revision or 0
+
+
+async def todo_changes_head(session: AsyncSession, user_id: int) -> str:
+    """A `since` token past every change committed so far."""
+    revision = await current_todo_revision(session, user_id)
+
+    # Writes still in flight get revision + 1 or later, and ids start at
+    # 1, so (revision + 1, 0) sorts before all of them.
+    return encode_cursor([revision + 1, 0])
+
+
+async def add_tombstones(
+    session: AsyncSession, user_id: int, todo_ids: Iterable[int], revision
+):
+    rows = [
+        {'user_id': user_id, 'revision': revision, 'todo_id': todo_id}
+        for todo_id in todo_ids
+    ]
+    if rows:
+        await session.execute(insert(TodoTombstone).values(rows))
+
+
+async def todo_changes(
+    session: AsyncSession,
+    user_id: int,
+    columns,
+    since: str | None,
+    limit: int,
+):
+    """Todos written and deleted after the `since` token, oldest first.
+
+    Both sides are read through their (user_id, revision, id) indexes and
+    merged, so the cost follows how much changed rather than how many
+    todos the user has. Returns (todos, deleted ids, next token, more).
+    """
+    since = since or encode_cursor([0, 0])
+    page = FilterPage(cursor=since, limit=limit)
+
+    written = await session.execute(
+        paginate(
+            select(*columns, Todo.revision).where(Todo.user_id == user_id),
+            (Todo.revision, Todo.id),
+            page,
+        )
+    )
+    deleted = await session.execute(
+        paginate(
+            select(TodoTombstone.revision, TodoTombstone.todo_id).where(
+                TodoTombstone.user_id == user_id
+            ),
+            (TodoTombstone.revision, TodoTombstone.todo_id),
+            page,
+        )
+    )
+
+    changes = sorted(
+        [(row.revision, row.id, row) for row in written]
+        + [(row.revision, row.todo_id, None) for row in deleted],
+        key=lambda change: change[:2],
+    )
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+    if changes:
+        since = encode_cursor(changes[-1][:2])
+
+    todos = [row for _, _, row in changes if row is not None]
+    deleted_ids = [todo_id for _, todo_id, row in changes if row is None]
+
+    return todos, deleted_ids, since, has_more
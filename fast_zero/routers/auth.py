@@ -3,7 +3,7 @@ from typing import Annotated
 
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy import select
+from sqlalchemy import func, or_, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from fast_zero.database import get_session
@@ -12,7 +12,9 @@ from fast_zero.schemas import Token
 from fast_zero.security import (
     create_access_token,
     get_current_user,
-    verify_password,
+    password_hasher,
+    remember_token_version,
+    user_claims,
 )
 
 router = APIRouter(prefix='/auth', tags=['auth'])
@@ -27,23 +29,38 @@ async def login_for_access_token(
     session: T_AsyncSession,
     form_data: T_OAuth2Form,
 ):
+    login = form_data.username
+    # Username or email; both lookups are index scans. An exact username
+    # match wins should another account use it as an email.
     user = await session.scalar(
-        select(User).where(User.username == form_data.username)
+        select(User)
+        .where(
+            or_(
+                User.username == login,
+                func.lower(User.email) == login.lower(),
+            )
+        )
+        .order_by(User.username != login)
+        .limit(1)
     )
 
-    if user is None or not verify_password(form_data.password, user.password):
+    if user is None or not await password_hasher.verify(
+        form_data.password, user.password
+    ):
         raise HTTPException(
             status_code=HTTPStatus.BAD_REQUEST,
             detail='Incorrect username or password',
         )
 
-    access_token = create_access_token(data_claims={'sub': user.username})
+    # Spares the first request with the new token a token_version lookup.
+    remember_token_version(user.id, user.token_version)
+    access_token = create_access_token(data_claims=user_claims(user))
 
     return {'access_token': access_token, 'token_type': 'Bearer'}
 
 
 @router.post('/refresh_token', response_model=Token)
 async def refresh_access_token(user: T_CurrentUser):
-    new_access_token = create_access_token(data_claims={'sub': user.username})
+    new_access_token = create_access_token(data_claims=user_claims(user))
 
     return {'access_token': new_access_token, 'token_type': 'Bearer'}
@@ -0,0 +1,185 @@
+from collections import Counter
+from dataclasses import dataclass, field
+from http import HTTPStatus
+from typing import Annotated, Any, Literal
+
+from fastapi import APIRouter, Body, Depends
+from pydantic import ValidationError
+from sqlalchemy import delete, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from fast_zero.broker import Broker, get_broker
+from fast_zero.counters import add_todo_counts
+from fast_zero.database import get_session
+from fast_zero.models import Todo
+from fast_zero.revisions import add_tombstones, next_todo_revision
+from fast_zero.routers.todo import TODO_COLUMNS, update_todos
+from fast_zero.schemas import (
+    BatchOperationResult,
+    BatchResult,
+    TodoCreateOperation,
+    TodoPatchOperation,
+    describe_errors,
+    todo_operation_adapter,
+)
+from fast_zero.security import Principal, get_current_principal
+from fast_zero.settings import Settings
+
+router = APIRouter(tags=['batch'])
+settings = Settings()
+
+T_AsyncSession = Annotated[AsyncSession, Depends(get_session)]
+T_CurrentPrincipal = Annotated[Principal, Depends(get_current_principal)]
+T_Broker = Annotated[Broker, Depends(get_broker)]
+
+
+def _not_found():
+    return BatchOperationResult(
+        status=HTTPStatus.NOT_FOUND, detail='Task not found.'
+    )
+
+
+@dataclass
+class _BatchWrites:
+    """Shared by a batch's operations. Counter deltas and tombstones are
+    collected here and written once, after the last operation."""
+
+    user_id: int
+    revision: int
+    deltas: Counter = field(default_factory=Counter)
+    deleted: list[int] = field(default_factory=list)
+
+
+async def _run_operation(
+    session: AsyncSession, writes: _BatchWrites, operation
+) -> BatchOperationResult:
+    if isinstance(operation, TodoCreateOperation):
+        todo = await session.execute(
+            insert(Todo)
+            .values(
+                **operation.todo.model_dump(),
+                user_id=writes.user_id,
+                revision=writes.revision,
+            )
+            .returning(*TODO_COLUMNS)
+        )
+        writes.deltas[operation.todo.state] += 1
+
+        return BatchOperationResult(
+            status=HTTPStatus.CREATED, todo=todo.one()._asdict()
+        )
+
+    owned = (Todo.user_id == writes.user_id, Todo.id == operation.id)
+
+    if isinstance(operation, TodoPatchOperation):
+        changes = operation.todo.model_dump(exclude_unset=True)
+        if changes:
+            todos, deltas = await update_todos(
+                session,
+                owned,
+                {**changes, 'revision': writes.revision},
+                TODO_COLUMNS,
+            )
+            writes.deltas.update(deltas)
+        else:
+            todos = await session.execute(select(*TODO_COLUMNS).where(*owned))
+            todos = todos.all()
+
+        if not todos:
+            return _not_found()
+
+        return BatchOperationResult(
+            status=HTTPStatus.OK, todo=todos[0]._asdict()
+        )
+
+    state = await session.scalar(
+        delete(Todo).where(*owned).returning(Todo.state)
+    )
+    if state is None:
+        return _not_found()
+
+    writes.deltas[state] -= 1
+    writes.deleted.append(operation.id)
+
+    return BatchOperationResult(status=HTTPStatus.OK)
+
+
+def _parse(operation: dict):
+    try:
+        return todo_operation_adapter.validate_python(operation)
+    except ValidationError as error:
+        return BatchOperationResult(
+            status=HTTPStatus.UNPROCESSABLE_ENTITY,
+            detail=describe_errors(error, 'operation'),
+        )
+
+
+def _failed(outcome) -> bool:
+    return (
+        isinstance(outcome, BatchOperationResult)
+        and outcome.status >= HTTPStatus.BAD_REQUEST
+    )
+
+
+def _abort(outcomes: list) -> BatchResult:
+    # Only the failed operations keep their error; the others were
+    # rolled back or never ran.
+    aborted = BatchOperationResult(
+        status=HTTPStatus.FAILED_DEPENDENCY, detail='Batch rolled back.'
+    )
+
+    return BatchResult(
+        committed=False,
+        results=[
+            outcome if _failed(outcome) else aborted for outcome in outcomes
+        ],
+    )
+
+
+@router.post('/batch', response_model=BatchResult)
+async def run_batch(
+    operations: Annotated[
+        list[dict[str, Any]],
+        Body(max_length=settings.BATCH_MAX_OPERATIONS),
+    ],
+    user: T_CurrentPrincipal,
+    session: T_AsyncSession,
+    broker: T_Broker,
+    mode: Annotated[Literal['atomic', 'continue'], Body()] = 'atomic',
+):
+    """Run todo operations in order, in one transaction.
+
+    Each operation is validated on its own, so in 'continue' mode an
+    invalid or failing operation is reported and skipped. In 'atomic'
+    mode the first failure rolls the whole batch back.
+    """
+    parsed = [_parse(operation) for operation in operations]
+    if mode == 'atomic' and any(map(_failed, parsed)):
+        return _abort(parsed)
+
+    # A validated operation can't fail in the database: a missing todo
+    # just matches no rows. So operations need no savepoints, and a
+    # failure in 'atomic' mode is a plain rollback.
+    writes, results = None, []
+    for index, operation in enumerate(parsed):
+        if _failed(operation):
+            results.append(operation)
+            continue
+
+        if writes is None:
+            writes = _BatchWrites(
+                user.id, await next_todo_revision(session, user.id)
+            )
+
+        results.append(await _run_operation(session, writes, operation))
+        if mode == 'atomic' and _failed(results[-1]):
+            await session.rollback()
+            return _abort(results + parsed[index + 1 :])
+
+    if writes is not None:
+        await add_tombstones(session, user.id, writes.deleted, writes.revision)
+        await add_todo_counts(session, user.id, writes.deltas)
+        await session.commit()
+        await broker.publish(user.id)
+
+    return BatchResult(committed=True, results=results)
@@ -0,0 +1,49 @@
+from http import HTTPStatus
+from secrets import compare_digest
+from typing import Annotated
+
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+
+from fast_zero.database import engine, pool_stats, replica_engines
+from fast_zero.schemas import DatabasePoolStats
+from fast_zero.settings import Settings
+
+settings = Settings()
+internal_scheme = HTTPBearer(auto_error=False)
+
+
+def require_internal_token(
+    credentials: Annotated[
+        HTTPAuthorizationCredentials | None, Depends(internal_scheme)
+    ],
+):
+    if settings.INTERNAL_TOKEN is None:
+        raise HTTPException(status_code=HTTPStatus.NOT_FOUND)
+
+    if credentials is None or not compare_digest(
+        credentials.credentials.encode(), settings.INTERNAL_TOKEN.encode()
+    ):
+        raise HTTPException(
+            status_code=HTTPStatus.UNAUTHORIZED,
+            detail='Invalid internal token',
+            headers={'WWW-Authenticate': 'Bearer'},
+        )
+
+
+# Operational endpoints, kept out of the public schema and only served to
+# callers holding INTERNAL_TOKEN, such as the metrics scraper.
+router = APIRouter(
+    prefix='/internal',
+    tags=['internal'],
+    include_in_schema=False,
+    dependencies=[Depends(require_internal_token)],
+)
+
+
+@router.get('/pool', response_model=DatabasePoolStats)
+async def read_pool_stats():
+    return {
+        **pool_stats(engine.pool),
+        'replicas': [pool_stats(replica.pool) for replica in replica_engines],
+    }
@@ -1,85 +1,679 @@
+import asyncio
+import csv
+import io
+from collections import Counter
+from collections.abc import Callable
+from contextlib import aclosing
+from functools import partial
 from http import HTTPStatus
-from typing import Annotated
+from typing import Annotated, Literal
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy import select
+from fastapi import (
+    APIRouter,
+    Body,
+    Depends,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+    WebSocket,
+    WebSocketDisconnect,
+    status,
+)
+from fastapi.responses import StreamingResponse
+from fastapi.security.utils import get_authorization_scheme_param
+from sqlalchemy import delete, insert, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from fast_zero.database import get_session
-from fast_zero.models import Todo, User
+from fast_zero.broker import Broker, get_broker
+from fast_zero.conditional import (
+    etag_matches,
+    make_etag,
+    not_modified,
+    set_etag,
+)
+from fast_zero.counters import (
+    add_todo_counts,
+    cached_todo_total,
+    count_states,
+)
+from fast_zero.database import get_session, get_session_factory
+from fast_zero.fieldsets import list_adapter, todo_fields
+from fast_zero.importer import import_todos
+from fast_zero.models import (
+    Todo,
+    TodoCounter,
+    TodoState,
+    todo_title_sort_key,
+)
+from fast_zero.pagination import decode_cursor, page_results, paginate
+from fast_zero.replicas import get_read_session
+from fast_zero.revisions import (
+    add_tombstones,
+    current_todo_revision,
+    next_todo_revision,
+    todo_changes,
+    todo_changes_head,
+)
 from fast_zero.schemas import (
+    PAGE_MAX_LIMIT,
     FilterTodo,
     Message,
+    TodoBulkResult,
+    TodoChanges,
+    TodoImportResult,
     TodoList,
     TodoPublic,
+    TodoRow,
     TodoSchema,
+    TodoSelection,
+    TodoStats,
     TodoUpdate,
 )
-from fast_zero.security import get_current_user
+from fast_zero.search import search_todos
+from fast_zero.security import (
+    Principal,
+    get_current_principal,
+    oauth2_scheme,
+    principal_from_token,
+)
+from fast_zero.settings import Settings
+from fast_zero.totals import count_total
 
 router = APIRouter(prefix='/todos', tags=['todos'])
+settings = Settings()
+
+EXPORT_BATCH_SIZE = 1000
+EXPORT_FIELDS = list(TodoPublic.model_fields)
+TODO_COLUMNS = tuple(getattr(Todo, field) for field in TodoPublic.model_fields)
+STREAM_BATCH_SIZE = 100
+IMPORT_FORMATS = {'application/x-ndjson': 'ndjson', 'text/csv': 'csv'}
 
 T_AsyncSession = Annotated[AsyncSession, Depends(get_session)]
-T_CurrentUser = Annotated[User, Depends(get_current_user)]
+T_ReadSession = Annotated[AsyncSession, Depends(get_read_session)]
+T_SessionFactory = Annotated[Callable, Depends(get_session_factory)]
+T_CurrentPrincipal = Annotated[Principal, Depends(get_current_principal)]
+T_Token = Annotated[str, Depends(oauth2_scheme)]
+T_Broker = Annotated[Broker, Depends(get_broker)]
+T_TodoFields = Annotated[tuple[str, ...], Depends(todo_fields)]
 
 
 @router.post('/', response_model=TodoPublic, status_code=HTTPStatus.CREATED)
 async def create_todo(
-    todo: TodoSchema, user: T_CurrentUser, session: T_AsyncSession
+    todo: TodoSchema,
+    user: T_CurrentPrincipal,
+    session: T_AsyncSession,
+    broker: T_Broker,
 ):
     db_todo = Todo(
         title=todo.title,
         description=todo.description,
         state=todo.state,
         user_id=user.id,
+        revision=await next_todo_revision(session, user.id),
     )
     session.add(db_todo)
+    await add_todo_counts(session, user.id, {todo.state: 1})
     await session.commit()
-    await session.refresh(db_todo)
+    await broker.publish(user.id)
 
     return db_todo
 
 
+@router.post(
+    '/bulk', response_model=list[TodoPublic], status_code=HTTPStatus.CREATED
+)
+async def create_todos_bulk(
+    todos: Annotated[
+        list[TodoSchema], Body(max_length=settings.TODO_BULK_MAX_SIZE)
+    ],
+    user: T_CurrentPrincipal,
+    session: T_AsyncSession,
+    broker: T_Broker,
+):
+    if not todos:
+        return []
+
+    revision = await next_todo_revision(session, user.id)
+    db_todos = await session.scalars(
+        insert(Todo).returning(Todo, sort_by_parameter_order=True),
+        [
+            {**todo.model_dump(), 'user_id': user.id, 'revision': revision}
+            for todo in todos
+        ],
+    )
+    db_todos = db_todos.all()
+    await add_todo_counts(
+        session, user.id, count_states(todo.state for todo in todos)
+    )
+    await session.commit()
+    await broker.publish(user.id)
+
+    return db_todos
+
+
+@router.post(
+    '/import',
+    response_model=TodoImportResult,
+    openapi_extra={
+        'requestBody': {
+            'required': True,
+            'content': {media_type: {} for media_type in IMPORT_FORMATS},
+        }
+    },
+)
+async def import_todos_stream(
+    request: Request,
+    user: T_CurrentPrincipal,
+    session: T_AsyncSession,
+    broker: T_Broker,
+):
+    media_type = request.headers.get('content-type', '').split(';')[0]
+    import_format = IMPORT_FORMATS.get(media_type.strip().lower())
+    if import_format is None:
+        raise HTTPException(
+            status_code=HTTPStatus.UNSUPPORTED_MEDIA_TYPE,
+            detail='Send application/x-ndjson or text/csv',
+        )
+
+    result = await import_todos(
+        session, user.id, request.stream(), import_format
+    )
+    if result.accepted:
+        await broker.publish(user.id)
+
+    return result
+
+
+def todo_filters(user_id: int, criteria: FilterTodo | TodoSelection):
+    filters = [Todo.user_id == user_id]
+
+    if getattr(criteria, 'ids', None) is not None:
+        filters.append(Todo.id.in_(criteria.ids))
+
+    if criteria.title:
+        filters.append(Todo.title.contains(criteria.title))
+
+    if criteria.description:
+        filters.append(Todo.description.contains(criteria.description))
+
+    if criteria.state:
+        filters.append(Todo.state == criteria.state)
+
+    for column in (Todo.created_at, Todo.updated_at):
+        prefix = column.key.removesuffix('_at')
+        after = getattr(criteria, f'{prefix}_after', None)
+        before = getattr(criteria, f'{prefix}_before', None)
+        if after is not None:
+            filters.append(column >= after)
+        if before is not None:
+            filters.append(column < before)
+
+    return filters
+
+
+def selection_filters(user_id: int, selection: TodoSelection):
+    """todo_filters for bulk writes, refusing to run with nothing but the
+    owner predicate: that would touch every todo the user has."""
+    filters = todo_filters(user_id, selection)
+    if len(filters) == 1:
+        raise HTTPException(
+            status_code=HTTPStatus.UNPROCESSABLE_ENTITY,
+            detail='Select todos by ids or by a filter',
+        )
+
+    return filters
+
+
+def todo_list_query(
+    user_id: int,
+    todo_filter: FilterTodo,
+    dialect: str,
+    columns=TODO_COLUMNS,
+):
+    """Build the paginated statement behind GET /todos/ together with the
+    function that reads the next page cursor off a result row."""
+    query = select(*columns).where(*todo_filters(user_id, todo_filter))
+
+    if todo_filter.q and todo_filter.q.strip():
+        query, rank, descending = search_todos(query, todo_filter.q, dialect)
+        if rank is not None:
+            query = paginate(
+                query.add_columns(rank),
+                (rank, Todo.id),
+                todo_filter,
+                descending=descending,
+            )
+            return query, lambda row: [row.rank, row.id]
+
+    descending = todo_filter.direction == 'desc'
+    if todo_filter.order_by == 'id':
+        query = paginate(query, (Todo.id,), todo_filter, descending=descending)
+        return query, lambda row: [row.id]
+
+    # Served by ix_todos_user_id_<order_by>_id. The sort column is read
+    # even when `columns` leaves it out, for the cursor.
+    if todo_filter.order_by == 'title':
+        sort_key = todo_title_sort_key()
+    else:
+        sort_key = getattr(Todo, todo_filter.order_by)
+    query = paginate(
+        query.add_columns(sort_key.label('sort_key')),
+        (sort_key, Todo.id),
+        todo_filter,
+        descending=descending,
+    )
+
+    return query, lambda row: [row.sort_key, row.id]
+
+
+# Filters the per-state counters can't answer for.
+UNCOUNTED_FILTERS = (
+    'q',
+    'title',
+    'description',
+    'created_after',
+    'created_before',
+    'updated_after',
+    'updated_before',
+)
+
+
+async def todo_total(
+    session: AsyncSession, user_id: int, todo_filter: FilterTodo
+):
+    query = select(Todo.id).where(*todo_filters(user_id, todo_filter))
+    if todo_filter.q and todo_filter.q.strip():
+        query, _, _ = search_todos(
+            query, todo_filter.q, session.bind.dialect.name
+        )
+
+    cached = None
+    if not any(getattr(todo_filter, name) for name in UNCOUNTED_FILTERS):
+        cached = partial(
+            cached_todo_total, session, user_id, todo_filter.state
+        )
+
+    return await count_total(session, query, todo_filter.include_total, cached)
+
+
 @router.get('/', response_model=TodoList)
 async def list_todos(
-    session: T_AsyncSession,
-    user: T_CurrentUser,
+    request: Request,
+    session: T_ReadSession,
+    user: T_CurrentPrincipal,
     todo_filter: Annotated[FilterTodo, Query()],
+    fields: T_TodoFields,
+):
+    # Every write to the user's todos bumps their revision, so it stands
+    # in for the contents of any filtered page.
+    revision = await current_todo_revision(session, user.id)
+    etag = make_etag(user.id, revision, todo_filter.model_dump(), fields)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    # Only the requested columns are read, so a narrow page may be served
+    # from an index alone.
+    query, cursor_of = todo_list_query(
+        user.id,
+        todo_filter,
+        session.bind.dialect.name,
+        tuple(getattr(Todo, field) for field in fields),
+    )
+    rows = await session.execute(query)
+    rows, next_cursor = page_results(rows.all(), todo_filter, cursor_of)
+    page = {
+        'todos': [row._asdict() for row in rows],
+        'next_cursor': next_cursor,
+    }
+    if todo_filter.include_total:
+        page['total'] = await todo_total(session, user.id, todo_filter)
+
+    # Rows are already the response shape: encode them directly instead
+    # of validating them again against response_model.
+    response = Response(
+        list_adapter(TodoRow, 'todos', fields).dump_json(page),
+        media_type='application/json',
+    )
+    set_etag(response, etag)
+
+    return response
+
+
+@router.get('/changes', response_model=TodoChanges)
+async def list_todo_changes(
+    session: T_ReadSession,
+    user: T_CurrentPrincipal,
+    since: str | None = None,
+    limit: Annotated[int, Query(ge=1, le=PAGE_MAX_LIMIT)] = 100,
 ):
-    query = select(Todo).where(Todo.user_id == user.id)
+    todos, deleted, next_since, has_more = await todo_changes(
+        session, user.id, TODO_COLUMNS, since, limit
+    )
+
+    return {
+        'todos': todos,
+        'deleted': deleted,
+        'next_since': next_since,
+        'has_more': has_more,
+    }
+
+
+async def stream_start(session_factory, user_id: int, since: str | None):
+    if since is not None:
+        # Reject a bad token now, while an error response can be sent.
+        decode_cursor(since, (Todo.revision, Todo.id))
+        return since
 
-    if todo_filter.title:
-        query = query.filter(Todo.title.contains(todo_filter.title))
+    async with session_factory() as session:
+        return await todo_changes_head(session, user_id)
 
-    if todo_filter.description:
-        query = query.filter(
-            Todo.description.contains(todo_filter.description)
+
+async def todo_change_events(
+    broker: Broker, session_factory, user_id: int, since: str, token: str
+):
+    """Yield a TodoChanges for every batch of changes after `since`, and
+    an empty one after each keepalive interval without any. The stream
+    ends once `token` expires or is revoked.
+
+    Changes are read from the primary, one short session per batch, so an
+    idle stream holds no connection. The feed is re-read on every
+    keepalive too, which covers a wake-up the broker lost.
+    """
+    async with broker.subscribe(user_id) as changed:
+        while True:
+            # Checked before every read, not only after keepalives, which a
+            # stream woken by frequent writes may never reach. The token
+            # version cache keeps this cheap.
+            try:
+                await principal_from_token(token, session_factory)
+            except HTTPException:
+                return
+
+            changed.clear()
+            async with session_factory() as session:
+                todos, deleted, since, has_more = await todo_changes(
+                    session, user_id, TODO_COLUMNS, since, STREAM_BATCH_SIZE
+                )
+
+            if todos or deleted:
+                yield TodoChanges(
+                    todos=[todo._asdict() for todo in todos],
+                    deleted=deleted,
+                    next_since=since,
+                    has_more=has_more,
+                )
+
+            if has_more:
+                continue
+
+            try:
+                await asyncio.wait_for(
+                    changed.wait(), settings.TODO_STREAM_KEEPALIVE_SECONDS
+                )
+            except TimeoutError:
+                yield TodoChanges(
+                    todos=[], deleted=[], next_since=since, has_more=False
+                )
+
+
+async def server_sent_events(events):
+    # Close `events` (and its subscription) as soon as the client leaves.
+    async with aclosing(events):
+        async for changes in events:
+            if not (changes.todos or changes.deleted):
+                yield ': keepalive\n\n'
+                continue
+
+            yield (
+                f'id: {changes.next_since}\n'
+                'event: changes\n'
+                f'data: {changes.model_dump_json()}\n\n'
+            )
+
+
+@router.get('/stream', response_class=StreamingResponse)
+async def stream_todo_changes(
+    token: T_Token,
+    broker: T_Broker,
+    session_factory: T_SessionFactory,
+    since: str | None = None,
+    last_event_id: Annotated[str | None, Header()] = None,
+):
+    """Server-sent events with the same payload as GET /todos/changes.
+    Each event id is a `since` token, so a reconnecting EventSource
+    resumes where it stopped."""
+    # The token itself is kept: the stream re-checks it on keepalives.
+    user = await principal_from_token(token, session_factory)
+    since = await stream_start(
+        session_factory, user.id, since or last_event_id
+    )
+
+    return StreamingResponse(
+        server_sent_events(
+            todo_change_events(broker, session_factory, user.id, since, token)
+        ),
+        media_type='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'},
+    )
+
+
+@router.websocket('/ws')
+async def todo_changes_socket(
+    websocket: WebSocket,
+    broker: T_Broker,
+    session_factory: T_SessionFactory,
+    since: str | None = None,
+    token: str | None = None,
+):
+    # Browsers can't set headers on the handshake, so the token may come
+    # in the query string instead.
+    _, credentials = get_authorization_scheme_param(
+        websocket.headers.get('Authorization')
+    )
+    token = token or credentials
+    try:
+        user = await principal_from_token(token, session_factory)
+        since = await stream_start(session_factory, user.id, since)
+    except HTTPException:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    events = todo_change_events(broker, session_factory, user.id, since, token)
+    try:
+        async with aclosing(events):
+            async for changes in events:
+                await websocket.send_text(changes.model_dump_json())
+    except WebSocketDisconnect:
+        return
+
+    # The events only run out once the token is no longer valid.
+    await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+
+
+@router.get('/stats', response_model=TodoStats)
+async def todo_stats(session: T_ReadSession, user: T_CurrentPrincipal):
+    by_state = dict.fromkeys(TodoState, 0)
+    counters = await session.execute(
+        select(TodoCounter.state, TodoCounter.count).where(
+            TodoCounter.user_id == user.id
+        )
+    )
+    by_state.update(counters.tuples().all())
+
+    return {'by_state': by_state, 'total': sum(by_state.values())}
+
+
+def _encode_ndjson(todos) -> str:
+    return ''.join(
+        TodoPublic.model_validate(todo, from_attributes=True).model_dump_json()
+        + '\n'
+        for todo in todos
+    )
+
+
+def _encode_csv(todos) -> str:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+    writer.writerows(
+        TodoPublic.model_validate(todo, from_attributes=True).model_dump(
+            mode='json'
         )
+        for todo in todos
+    )
+    return buffer.getvalue()
 
-    if todo_filter.state:
-        query = query.filter(Todo.state == todo_filter.state)
 
-    todos = await session.scalars(
-        query.offset(todo_filter.offset).limit(todo_filter.limit)
+async def _export_todos(session_factory, user_id: int, export_format: str):
+    query = (
+        select(Todo)
+        .where(Todo.user_id == user_id)
+        .order_by(Todo.id)
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
     )
+    encode = _encode_csv if export_format == 'csv' else _encode_ndjson
+
+    if export_format == 'csv':
+        yield ','.join(EXPORT_FIELDS) + '\r\n'
 
-    return {'todos': todos.all()}
+    async with session_factory() as session:
+        todos = await session.stream_scalars(query)
+        async for batch in todos.partitions():
+            yield encode(batch)
+
+
+@router.get('/export')
+async def export_todos(
+    user: T_CurrentPrincipal,
+    session_factory: T_SessionFactory,
+    export_format: Annotated[
+        Literal['ndjson', 'csv'], Query(alias='format')
+    ] = 'ndjson',
+):
+    media_type = (
+        'text/csv' if export_format == 'csv' else 'application/x-ndjson'
+    )
+    filename = f'todos.{export_format}'
+
+    return StreamingResponse(
+        _export_todos(session_factory, user.id, export_format),
+        media_type=media_type,
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'},
+    )
+
+
+async def update_todos(session, filters, changes: dict, columns):
+    """UPDATE the todos matching `filters` and return their `columns`,
+    along with the counter deltas for the states they left and entered
+    (empty unless the state changes), for the caller's transaction."""
+    query = update(Todo).values(**changes)
+    if 'state' not in changes:
+        rows = await session.execute(query.where(*filters).returning(*columns))
+        return rows.all(), Counter()
+
+    if session.bind.dialect.name == 'postgresql':  # pragma: no cover
+        # Locked before the UPDATE runs, so it still holds the states
+        # being replaced; joined rather than looked up row by row.
+        old = (
+            select(Todo.id.label('old_id'), Todo.state.label('old_state'))
+            .where(*filters)
+            .with_for_update()
+            .cte('old')
+        )
+        rows = await session.execute(
+            query.add_cte(old)
+            .where(Todo.id == old.c.old_id)
+            .returning(*columns, old.c.old_state)
+        )
+        rows = rows.all()
+        old_states = [row.old_state for row in rows]
+    else:
+        # SQLite's RETURNING can't read the FROM clause. The caller holds
+        # the write lock since next_todo_revision, so the states read
+        # here are still the ones the UPDATE replaces.
+        old_states = (
+            await session.scalars(select(Todo.state).where(*filters))
+        ).all()
+        rows = await session.execute(query.where(*filters).returning(*columns))
+        rows = rows.all()
+
+    deltas = count_states(old_states, -1)
+    deltas[changes['state']] += len(rows)
+
+    return rows, deltas
+
+
+@router.patch('/', response_model=TodoBulkResult)
+async def patch_todos(
+    session: T_AsyncSession,
+    user: T_CurrentPrincipal,
+    selection: Annotated[TodoSelection, Query()],
+    todo: TodoUpdate,
+    broker: T_Broker,
+):
+    changes = todo.model_dump(exclude_unset=True)
+    if not changes:
+        return {'affected': 0, 'ids': []}
+
+    changes['revision'] = await next_todo_revision(session, user.id)
+    rows, deltas = await update_todos(
+        session, selection_filters(user.id, selection), changes, (Todo.id,)
+    )
+    await add_todo_counts(session, user.id, deltas)
+    await session.commit()
+    await broker.publish(user.id)
+
+    return {'affected': len(rows), 'ids': [row.id for row in rows]}
+
+
+@router.delete('/', response_model=TodoBulkResult)
+async def delete_todos(
+    session: T_AsyncSession,
+    user: T_CurrentPrincipal,
+    selection: Annotated[TodoSelection, Query()],
+    broker: T_Broker,
+):
+    revision = await next_todo_revision(session, user.id)
+    rows = await session.execute(
+        delete(Todo)
+        .where(*selection_filters(user.id, selection))
+        .returning(Todo.id, Todo.state)
+    )
+    rows = rows.all()
+    await add_tombstones(session, user.id, (row.id for row in rows), revision)
+    await add_todo_counts(
+        session, user.id, count_states((row.state for row in rows), -1)
+    )
+    await session.commit()
+    await broker.publish(user.id)
+
+    return {'affected': len(rows), 'ids': [row.id for row in rows]}
 
 
 @router.delete('/{todo_id}', response_model=Message)
 async def delete_todo(
-    todo_id: int, session: T_AsyncSession, user: T_CurrentUser
+    todo_id: int,
+    session: T_AsyncSession,
+    user: T_CurrentPrincipal,
+    broker: T_Broker,
 ):
-    todo = await session.scalar(
-        select(Todo).where(Todo.user_id == user.id, Todo.id == todo_id)
+    revision = await next_todo_revision(session, user.id)
+    state = await session.scalar(
+        delete(Todo)
+        .where(Todo.user_id == user.id, Todo.id == todo_id)
+        .returning(Todo.state)
     )
-    if not todo:
+    if state is None:
         raise HTTPException(
             status_code=HTTPStatus.NOT_FOUND, detail='Task not found.'
         )
 
-    await session.delete(todo)
+    await add_tombstones(session, user.id, [todo_id], revision)
+    await add_todo_counts(session, user.id, {state: -1})
     await session.commit()
+    await broker.publish(user.id)
 
     return {'message': 'Task has been deleted successfully.'}
 
@@ -88,21 +682,29 @@ async def delete_todo(
 async def patch_todo(
     todo_id: int,
     session: T_AsyncSession,
-    user: T_CurrentUser,
+    user: T_CurrentPrincipal,
     todo: TodoUpdate,
+    broker: T_Broker,
 ):
-    db_todo = await session.scalar(
-        select(Todo).where(Todo.user_id == user.id, Todo.id == todo_id)
-    )
-    if not db_todo:
+    owned = (Todo.user_id == user.id, Todo.id == todo_id)
+    changes = todo.model_dump(exclude_unset=True)
+    if changes:
+        changes['revision'] = await next_todo_revision(session, user.id)
+        rows, deltas = await update_todos(
+            session, owned, changes, TODO_COLUMNS
+        )
+    else:
+        rows = await session.execute(select(*TODO_COLUMNS).where(*owned))
+        rows, deltas = rows.all(), Counter()
+
+    if not rows:
         raise HTTPException(
             status_code=HTTPStatus.NOT_FOUND, detail='Task not found.'
         )
-    for key, value in todo.model_dump(exclude_unset=True).items():
-        setattr(db_todo, key, value)
 
-    session.add(db_todo)
+    await add_todo_counts(session, user.id, deltas)
     await session.commit()
-    await session.refresh(db_todo)
+    if changes:
+        await broker.publish(user.id)
 
-    return db_todo
+    return rows[0]
@@ -1,85 +1,142 @@
 from http import HTTPStatus
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy import and_, select
+from fastapi import (
+    APIRouter,
+    Depends,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+)
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from fast_zero.database import get_session
+from fast_zero.conditional import (
+    etag_matches,
+    make_etag,
+    not_modified,
+    set_etag,
+)
+from fast_zero.database import get_session, violated_constraint
+from fast_zero.fieldsets import list_adapter, user_fields
 from fast_zero.models import User
+from fast_zero.pagination import page_results, paginate
+from fast_zero.replicas import get_read_session
 from fast_zero.schemas import (
     FilterPage,
     Message,
     UserList,
     UserPublic,
+    UserRow,
     UserSchema,
 )
-from fast_zero.security import get_current_user, get_password_hash
+from fast_zero.security import (
+    get_current_user,
+    password_hasher,
+    remember_token_version,
+)
+from fast_zero.totals import count_total
 
 router = APIRouter(prefix='/users', tags=['users'])
 
 T_AsyncSession = Annotated[AsyncSession, Depends(get_session)]
+T_ReadSession = Annotated[AsyncSession, Depends(get_read_session)]
 T_CurrentUser = Annotated[User, Depends(get_current_user)]
+T_UserFields = Annotated[tuple[str, ...], Depends(user_fields)]
 
+USER_CONFLICTS = {
+    'users_username_key': 'Username already exists',
+    'users_email_key': 'Email already exists',
+    'uq_users_email_lower': 'Email already exists',
+}
 
-@router.post('/', response_model=UserPublic, status_code=HTTPStatus.CREATED)
-async def create_user(user: UserSchema, session: T_AsyncSession):
-    db_user = await session.scalar(
-        select(User).where(
-            (User.username == user.username) | (User.email == user.email)
-        )
-    )
 
-    if db_user:
-        if db_user.username == user.username:
-            raise HTTPException(
-                status_code=HTTPStatus.CONFLICT,
-                detail='Username already exists',
-            )
-        elif db_user.email == user.email:
-            raise HTTPException(
-                status_code=HTTPStatus.CONFLICT, detail='Email already exists'
-            )
+async def _commit_user(session: AsyncSession):
+    """Commit, turning unique violations into the matching 409. The
+    constraints are the only check, so concurrent writes can't race."""
+    try:
+        await session.commit()
+    except IntegrityError as error:
+        await session.rollback()
+        detail = USER_CONFLICTS.get(violated_constraint(error))
+        if detail is None:
+            raise
 
+        raise HTTPException(status_code=HTTPStatus.CONFLICT, detail=detail)
+
+
+@router.post('/', response_model=UserPublic, status_code=HTTPStatus.CREATED)
+async def create_user(user: UserSchema, session: T_AsyncSession):
     db_user = User(
         username=user.username,
-        password=get_password_hash(user.password.get_secret_value()),
+        password=await password_hasher.hash(user.password.get_secret_value()),
         email=user.email,
     )
     session.add(db_user)
-    await session.commit()
-    await session.refresh(db_user)
+    await _commit_user(session)
 
     return db_user
 
 
 @router.get('/', response_model=UserList)
 async def read_users(
-    session: T_AsyncSession,
+    session: T_ReadSession,
     filter_users: Annotated[FilterPage, Query()],
     current_user: T_CurrentUser,
+    fields: T_UserFields,
 ):
-    query = await session.scalars(
-        select(User).limit(filter_users.limit).offset(filter_users.offset)
+    keys = (User.id,)
+    columns = (getattr(User, field) for field in fields)
+    query = await session.execute(
+        paginate(select(*columns), keys, filter_users)
     )
 
-    users = query.all()
+    users, next_cursor = page_results(
+        query.all(), filter_users, lambda user: [user.id]
+    )
+    page = {
+        'users': [user._asdict() for user in users],
+        'next_cursor': next_cursor,
+    }
+    if filter_users.include_total:
+        # No counter keeps the number of users: 'cached' counts exactly.
+        page['total'] = await count_total(
+            session, select(User.id), filter_users.include_total
+        )
 
-    return {'users': users}
+    return Response(
+        list_adapter(UserRow, 'users', fields).dump_json(page),
+        media_type='application/json',
+    )
 
 
 @router.get('/{user_id}', response_model=UserPublic)
 async def read_user_by_id(
     user_id: int,
-    session: T_AsyncSession,
+    request: Request,
+    response: Response,
+    session: T_ReadSession,
     current_user: T_CurrentUser,
 ):
-    user = await session.scalar(select(User).where(User.id == user_id))
+    user = await session.execute(
+        select(User.id, User.username, User.email, User.updated_at).where(
+            User.id == user_id
+        )
+    )
+    user = user.first()
     if user is None:
         raise HTTPException(
             status_code=HTTPStatus.NOT_FOUND, detail='User not found'
         )
 
+    etag = make_etag(*user)
+    if etag_matches(request, etag):
+        return not_modified(etag)
+
+    set_etag(response, etag)
+
     return user
 
 
@@ -94,31 +151,15 @@ async def update_user(
         raise HTTPException(
             status_code=HTTPStatus.FORBIDDEN, detail='Not enough permissions'
         )
-    db_user = await session.scalar(
-        select(User).where(
-            and_(
-                (User.username == user.username) | (User.email == user.email),
-                User.id != current_user.id,
-            )
-        )
-    )
-    if db_user:
-        if db_user.username == user.username:
-            raise HTTPException(
-                status_code=HTTPStatus.CONFLICT,
-                detail='Username already exists',
-            )
-        elif db_user.email == user.email:
-            raise HTTPException(
-                status_code=HTTPStatus.CONFLICT, detail='Email already exists'
-            )
-
     current_user.email = user.email
     current_user.username = user.username
-    current_user.password = get_password_hash(user.password.get_secret_value())
+    current_user.password = await password_hasher.hash(
+        user.password.get_secret_value()
+    )
+    current_user.token_version += 1
 
-    await session.commit()
-    await session.refresh(current_user)
+    await _commit_user(session)
+    remember_token_version(current_user.id, current_user.token_version)
 
     return current_user
 
@@ -136,5 +177,6 @@ async def delete_user(
 
     await session.delete(current_user)
     await session.commit()
+    remember_token_version(current_user.id, None)
 
     return {'message': 'User deleted'}
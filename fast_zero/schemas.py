@@ -1,8 +1,18 @@
 from datetime import datetime
+from typing import Annotated, Literal, TypedDict
 
-from pydantic import BaseModel, ConfigDict, EmailStr, SecretStr
+from pydantic import (
+    BaseModel,
+    ConfigDict,
+    EmailStr,
+    Field,
+    SecretStr,
+    TypeAdapter,
+    ValidationError,
+    model_validator,
+)
 
-from fast_zero.models import TodoState
+from fast_zero.models import TITLE_MAX_LENGTH, TodoState
 
 
 class Message(BaseModel):
@@ -23,8 +33,24 @@ class UserPublic(BaseModel):
     model_config = ConfigDict(from_attributes=True)
 
 
+class Total(BaseModel):
+    value: int
+    strategy: Literal['exact', 'estimate', 'cached']
+    # The exact count stopped at TOTAL_EXACT_CAP; the real one is higher.
+    capped: bool = False
+
+
 class UserList(BaseModel):
     users: list[UserPublic]
+    next_cursor: str | None = None
+    # Only with ?include_total=, which may answer with another strategy.
+    total: Total | None = None
+
+
+class UserRow(TypedDict):
+    id: int
+    username: str
+    email: str
 
 
 class Token(BaseModel):
@@ -33,12 +59,14 @@ class Token(BaseModel):
 
 
 class TodoSchema(BaseModel):
-    title: str
+    title: str = Field(max_length=TITLE_MAX_LENGTH)
     description: str
     state: TodoState
 
 
 class TodoPublic(TodoSchema):
+    # The limit is for input only: older todos may have longer titles.
+    title: str
     id: int
     created_at: datetime
     updated_at: datetime
@@ -46,20 +74,173 @@ class TodoPublic(TodoSchema):
 
 class TodoList(BaseModel):
     todos: list[TodoPublic]
+    next_cursor: str | None = None
+    total: Total | None = None
+
+
+class TodoRow(TypedDict):
+    id: int
+    title: str
+    description: str
+    state: TodoState
+    created_at: datetime
+    updated_at: datetime
+
+
+class TodoChanges(BaseModel):
+    # Apply `deleted` before `todos`; pass `next_since` back as `since`.
+    todos: list[TodoPublic]
+    deleted: list[int]
+    next_since: str
+    has_more: bool
+
+
+class TodoStats(BaseModel):
+    by_state: dict[TodoState, int]
+    total: int
+
+
+# limit=0 returns an empty page, e.g. to only read include_total.
+PAGE_MAX_LIMIT = 1000
 
 
 class FilterPage(BaseModel):
-    offset: int = 0
-    limit: int = 100
+    offset: int = Field(default=0, ge=0)
+    limit: int = Field(default=100, ge=0, le=PAGE_MAX_LIMIT)
+    cursor: str | None = None
+    include_total: Literal['exact', 'estimate', 'cached'] | None = None
 
 
 class FilterTodo(FilterPage):
+    q: str | None = None
     title: str | None = None
     description: str | None = None
     state: TodoState | None = None
+    # Ranges are half-open: after <= value < before.
+    created_after: datetime | None = None
+    created_before: datetime | None = None
+    updated_after: datetime | None = None
+    updated_before: datetime | None = None
+    order_by: Literal['id', 'created_at', 'updated_at', 'title', 'state'] = (
+        'id'
+    )
+    direction: Literal['asc', 'desc'] = 'asc'
+
+    @model_validator(mode='after')
+    def check_index_backed(self):
+        """Allow only what an index on (user_id, order_by, id) can serve
+        as a range scan, never a sort of every matching row."""
+        ordered = self.order_by != 'id' or self.direction != 'asc'
+        if self.q and self.q.strip() and ordered:
+            raise ValueError('Search results are ordered by rank')
+
+        for column in ('created_at', 'updated_at'):
+            prefix = column.removesuffix('_at')
+            bounds = (f'{prefix}_after', f'{prefix}_before')
+            if self.order_by != column and any(
+                getattr(self, bound) is not None for bound in bounds
+            ):
+                raise ValueError(
+                    f'{" and ".join(bounds)} need order_by={column}'
+                )
+
+        return self
 
 
 class TodoUpdate(BaseModel):
-    title: str | None = None
+    title: str | None = Field(default=None, max_length=TITLE_MAX_LENGTH)
     description: str | None = None
     state: TodoState | None = None
+
+
+class TodoSelection(BaseModel):
+    # A blank filter would match every todo, so it is rejected outright.
+    ids: list[int] | None = None
+    title: str | None = Field(default=None, pattern=r'\S')
+    description: str | None = Field(default=None, pattern=r'\S')
+    state: TodoState | None = None
+
+    @model_validator(mode='after')
+    def check_not_empty(self):
+        selected = (self.ids, self.title, self.description, self.state)
+        if all(value is None for value in selected):
+            raise ValueError('Select todos by ids or by a filter')
+        return self
+
+
+class TodoBulkResult(BaseModel):
+    affected: int
+    ids: list[int]
+
+
+class TodoImportError(BaseModel):
+    line: int
+    detail: str
+
+
+class TodoImportResult(BaseModel):
+    accepted: int = 0
+    rejected: int = 0
+    errors: list[TodoImportError] = []
+
+
+class TodoCreateOperation(BaseModel):
+    op: Literal['create']
+    todo: TodoSchema
+
+
+class TodoPatchOperation(BaseModel):
+    op: Literal['patch']
+    id: int
+    todo: TodoUpdate
+
+
+class TodoDeleteOperation(BaseModel):
+    op: Literal['delete']
+    id: int
+
+
+TodoOperation = Annotated[
+    TodoCreateOperation | TodoPatchOperation | TodoDeleteOperation,
+    Field(discriminator='op'),
+]
+todo_operation_adapter = TypeAdapter(TodoOperation)
+
+
+class BatchOperationResult(BaseModel):
+    status: int
+    todo: TodoPublic | None = None
+    detail: str | None = None
+
+
+class BatchResult(BaseModel):
+    committed: bool
+    results: list[BatchOperationResult]
+
+
+def describe_errors(error: ValidationError, root: str) -> str:
+    return '; '.join(
+        f'{".".join(map(str, e["loc"])) or root}: {e["msg"]}'
+        for e in error.errors()
+    )
+
+
+class PoolWaitHistogram(BaseModel):
+    buckets: dict[str, int]
+    count: int
+    sum: float
+
+
+class PoolStats(BaseModel):
+    size: int
+    checked_out: int
+    idle: int
+    overflow: int
+    checkouts: int
+    failures: int
+    wait_seconds: PoolWaitHistogram
+
+
+class DatabasePoolStats(PoolStats):
+    # In DATABASE_REPLICA_URLS order.
+    replicas: list[PoolStats]
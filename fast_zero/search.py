@@ -0,0 +1,58 @@
+from sqlalchemy import (
+    Float,
+    Select,
+    cast,
+    column,
+    func,
+    literal_column,
+    or_,
+    table,
+)
+from sqlalchemy.dialects.postgresql import DOUBLE_PRECISION
+
+from fast_zero.models import Todo, todo_search_document
+
+todos_fts = table(
+    'todos_fts', column('rowid'), column('rank', Float), column('todos_fts')
+)
+
+
+def _fts5_query(q: str) -> str:
+    # Quote every term so user input is never parsed as FTS5 syntax.
+    return ' '.join(
+        '"{}"'.format(term.replace('"', '""')) for term in q.split()
+    )
+
+
+def search_todos(query: Select, q: str, dialect: str):
+    """Restrict `query` to todos matching `q` and return it along with
+    the rank expression to order by and whether higher ranks go first.
+
+    Postgres uses the `ix_todos_search` GIN index, SQLite the `todos_fts`
+    FTS5 table. Other backends fall back to unranked substring matching.
+    """
+    if dialect == 'postgresql':
+        tsquery = func.websearch_to_tsquery(literal_column("'simple'"), q)
+        document = todo_search_document()
+        # ts_rank is real; compared with the cursor's float8 value it never
+        # equals itself, so the rank is widened in the select and the
+        # keyset comparison alike.
+        rank = cast(func.ts_rank(document, tsquery), DOUBLE_PRECISION).label(
+            'rank'
+        )
+
+        return query.where(document.op('@@')(tsquery)), rank, True
+
+    if dialect == 'sqlite':
+        rank = todos_fts.c.rank.label('rank')
+        query = query.join(todos_fts, todos_fts.c.rowid == Todo.id).where(
+            todos_fts.c.todos_fts.match(_fts5_query(q))
+        )
+
+        return query, rank, False
+
+    query = query.where(
+        or_(Todo.title.contains(q), Todo.description.contains(q))
+    )
+
+    return query, None, False
@@ -1,3 +1,13 @@
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import (
+    Executor,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
+from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
 from http import HTTPStatus
 
@@ -9,7 +19,7 @@ from pwdlib import PasswordHash
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from fast_zero.database import get_session
+from fast_zero.database import get_session, get_session_factory
 from fast_zero.models import User
 from fast_zero.settings import Settings
 
@@ -26,6 +36,54 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
+class PasswordHasher:
+    """Runs Argon2 hashing in a worker pool instead of the event loop.
+
+    At most `max_pending` operations may be running or queued at once;
+    beyond that callers get a 503 instead of piling up behind the pool.
+    """
+
+    def __init__(self, executor: Executor, max_pending: int):
+        self.executor = executor
+        self._slots = threading.BoundedSemaphore(max_pending)
+
+    async def _run(self, func, *args):
+        if not self._slots.acquire(blocking=False):
+            raise HTTPException(
+                status_code=HTTPStatus.SERVICE_UNAVAILABLE,
+                detail='Too many password operations in progress',
+                headers={'Retry-After': '1'},
+            )
+
+        future = self.executor.submit(func, *args)
+        future.add_done_callback(lambda _: self._slots.release())
+
+        return await asyncio.wrap_future(future)
+
+    async def hash(self, password: str) -> str:
+        return await self._run(get_password_hash, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(
+            verify_password, plain_password, hashed_password
+        )
+
+
+def _build_executor() -> Executor:
+    if settings.PASSWORD_HASH_EXECUTOR == 'process':
+        return ProcessPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS)
+
+    return ThreadPoolExecutor(
+        max_workers=settings.PASSWORD_HASH_WORKERS,
+        thread_name_prefix='password-hash',
+    )
+
+
+password_hasher = PasswordHasher(
+    _build_executor(), max_pending=settings.PASSWORD_HASH_MAX_PENDING
+)
+
+
 def create_access_token(data_claims: dict) -> str:
     to_encode = data_claims.copy()
 
@@ -39,22 +97,80 @@ def create_access_token(data_claims: dict) -> str:
     return encoded_jwt
 
 
-async def get_current_user(
-    session: AsyncSession = Depends(get_session),
-    token: str = Depends(oauth2_scheme),
-):
-    credentials_exception = HTTPException(
+def user_claims(user: User) -> dict:
+    return {
+        'sub': user.username,
+        'uid': user.id,
+        'ver': user.token_version,
+    }
+
+
+@dataclass(frozen=True)
+class Principal:
+    id: int
+    username: str
+    token_version: int
+
+
+# user id -> (current token version, None once deleted; valid until).
+# Each worker caches what it read from users.token_version, so a token
+# revoked elsewhere stops working within TOKEN_VERSION_CACHE_SECONDS.
+# Entries share one TTL, so insertion order is expiry order too.
+token_versions: OrderedDict[int, tuple[int | None, float]] = OrderedDict()
+
+
+def remember_token_version(user_id: int, token_version: int | None):
+    now = time.monotonic()
+    token_versions[user_id] = (
+        token_version,
+        now + settings.TOKEN_VERSION_CACHE_SECONDS,
+    )
+    token_versions.move_to_end(user_id)
+
+    # Drop what has expired, and the oldest entries beyond the size cap.
+    while token_versions:
+        _, valid_until = next(iter(token_versions.values()))
+        if (
+            valid_until > now
+            and len(token_versions) <= settings.TOKEN_VERSION_CACHE_SIZE
+        ):
+            break
+        token_versions.popitem(last=False)
+
+
+async def current_token_version(session_factory, user_id: int) -> int | None:
+    token_version, valid_until = token_versions.get(user_id, (None, 0.0))
+    if valid_until > time.monotonic():
+        return token_version
+
+    async with session_factory() as session:
+        token_version = await session.scalar(
+            select(User.token_version).where(User.id == user_id)
+        )
+    remember_token_version(user_id, token_version)
+
+    return token_version
+
+
+def _credentials_exception() -> HTTPException:
+    return HTTPException(
         status_code=HTTPStatus.UNAUTHORIZED,
         detail='Could not validate credentials',
         headers={'WWW-Authenticate': 'Bearer'},
     )
 
+
+def decode_principal(token: str) -> Principal:
+    credentials_exception = _credentials_exception()
+
     try:
         payload = decode(
             token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM]
         )
-        username: str = payload.get('sub')
-        if username is None:
+        username = payload.get('sub')
+        user_id = payload.get('uid')
+        token_version = payload.get('ver')
+        if username is None or user_id is None or token_version is None:
             raise credentials_exception
 
     except ExpiredSignatureError:
@@ -63,8 +179,41 @@ async def get_current_user(
     except PyJWTError:
         raise credentials_exception
 
-    user = await session.scalar(select(User).where(User.username == username))
+    return Principal(
+        id=user_id, username=username, token_version=token_version
+    )
+
+
+async def principal_from_token(token: str, session_factory) -> Principal:
+    principal = decode_principal(token)
+
+    token_version = await current_token_version(session_factory, principal.id)
+    if token_version != principal.token_version:
+        raise _credentials_exception()
+
+    return principal
+
+
+async def get_current_principal(
+    token: str = Depends(oauth2_scheme),
+    session_factory=Depends(get_session_factory),
+):
+    return await principal_from_token(token, session_factory)
+
+
+async def get_current_user(
+    session: AsyncSession = Depends(get_session),
+    token: str = Depends(oauth2_scheme),
+):
+    principal = decode_principal(token)
+
+    user = await session.scalar(select(User).where(User.id == principal.id))
     if user is None:
-        raise credentials_exception
+        remember_token_version(principal.id, None)
+        raise _credentials_exception()
+
+    remember_token_version(user.id, user.token_version)
+    if user.token_version != principal.token_version:
+        raise _credentials_exception()
 
     return user
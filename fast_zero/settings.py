@@ -1,3 +1,5 @@
+from typing import Literal
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -10,3 +12,37 @@ class Settings(BaseSettings):
     SECRET_KEY: str
     ALGORITHM: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int
+
+    DATABASE_POOL_SIZE: int = 5
+    DATABASE_MAX_OVERFLOW: int = 10
+    DATABASE_POOL_TIMEOUT: float = 30
+    DATABASE_POOL_RECYCLE: int = -1
+    DATABASE_POOL_PRE_PING: bool = False
+    DATABASE_PREPARE_THRESHOLD: int | None = 5
+
+    # JSON list, e.g. '["postgresql+psycopg://...@replica-1/app_db"]'
+    DATABASE_REPLICA_URLS: list[str] = []
+    DATABASE_REPLICA_STRATEGY: Literal['round_robin', 'least_connections'] = (
+        'round_robin'
+    )
+    READ_YOUR_WRITES_SECONDS: float = 5.0
+    # How long a worker trusts the users.token_version it last read.
+    TOKEN_VERSION_CACHE_SECONDS: float = 5.0
+    TOKEN_VERSION_CACHE_SIZE: int = 10_000
+
+    # Bearer token for /internal; those routes answer 404 while unset.
+    INTERNAL_TOKEN: str | None = None
+
+    PASSWORD_HASH_EXECUTOR: Literal['thread', 'process'] = 'thread'
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_PENDING: int = 64
+
+    TODO_BULK_MAX_SIZE: int = 1000
+    BATCH_MAX_OPERATIONS: int = 100
+    # ?include_total=exact stops counting here.
+    TOTAL_EXACT_CAP: int = 10_000
+
+    # 'postgres' fans todo change events out to every worker through
+    # LISTEN/NOTIFY; 'memory' only reaches streams in the same process.
+    TODO_BROKER: Literal['memory', 'postgres'] = 'memory'
+    TODO_STREAM_KEEPALIVE_SECONDS: float = 15.0
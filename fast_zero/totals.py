@@ -0,0 +1,50 @@
+from collections.abc import Awaitable, Callable
+
+from sqlalchemy import Select, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from fast_zero.database import settings
+from fast_zero.schemas import Total
+
+
+async def exact_total(session: AsyncSession, query: Select) -> Total:
+    # Counting stops at the cap, so a huge list costs no more than that.
+    cap = settings.TOTAL_EXACT_CAP
+    count = await session.scalar(
+        select(func.count()).select_from(query.limit(cap + 1).subquery())
+    )
+
+    return Total(value=min(count, cap), strategy='exact', capped=count > cap)
+
+
+async def estimated_total(session: AsyncSession, query: Select) -> Total:
+    """The planner's row estimate for `query`, from EXPLAIN: no rows are
+    read, but the figure is only as fresh as the last ANALYZE."""
+    compiled = query.compile(dialect=session.bind.dialect)
+    connection = await session.connection()
+    plan = await connection.exec_driver_sql(
+        f'EXPLAIN (FORMAT JSON) {compiled}', compiled.params
+    )
+
+    return Total(
+        value=round(plan.scalar()[0]['Plan']['Plan Rows']),
+        strategy='estimate',
+    )
+
+
+async def count_total(
+    session: AsyncSession,
+    query: Select,
+    strategy: str,
+    cached: Callable[[], Awaitable[int]] | None = None,
+) -> Total:
+    """Count the rows of `query` with `strategy`, or with an exact capped
+    count when that strategy can't serve it: `cached` needs a counter
+    (None when the filters have none) and estimates need Postgres."""
+    if strategy == 'cached' and cached is not None:
+        return Total(value=await cached(), strategy='cached')
+
+    if strategy == 'estimate' and session.bind.dialect.name == 'postgresql':
+        return await estimated_total(session, query)
+
+    return await exact_total(session, query)
@@ -0,0 +1,36 @@
+"""users email lower unique
+
+Revision ID: 1b7c3e9d5f42
+Revises: 8d4e6b1f9a27
+Create Date: 2026-10-18 15:02:11.530418
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1b7c3e9d5f42'
+down_revision: Union[str, None] = '8d4e6b1f9a27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Fails if two accounts already share an email up to case; merge or
+    # rename them first.
+    if op.get_context().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            op.create_index('uq_users_email_lower', 'users', [sa.text('lower(email)')], unique=True, postgresql_concurrently=True)
+    else:
+        op.create_index('uq_users_email_lower', 'users', [sa.text('lower(email)')], unique=True)
+
+
+def downgrade() -> None:
+    if op.get_context().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            op.drop_index('uq_users_email_lower', table_name='users', postgresql_concurrently=True)
+    else:
+        op.drop_index('uq_users_email_lower', table_name='users')
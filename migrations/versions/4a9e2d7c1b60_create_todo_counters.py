@@ -0,0 +1,44 @@
+"""create todo_counters
+
+Revision ID: 4a9e2d7c1b60
+Revises: 1b7c3e9d5f42
+Create Date: 2026-10-18 15:41:52.207316
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4a9e2d7c1b60'
+down_revision: Union[str, None] = '1b7c3e9d5f42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+STATES = ('draft', 'todo', 'doing', 'done', 'trash')
+
+
+def upgrade() -> None:
+    # The todostate type already exists on Postgres, created with todos.
+    state = sa.Enum(*STATES, name='todostate').with_variant(
+        postgresql.ENUM(*STATES, name='todostate', create_type=False),
+        'postgresql',
+    )
+    op.create_table('todo_counters',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('state', state, nullable=False),
+    sa.Column('count', sa.Integer(), server_default='0', nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'state')
+    )
+    op.execute(
+        'INSERT INTO todo_counters (user_id, state, count) '
+        'SELECT user_id, state, count(*) FROM todos GROUP BY user_id, state'
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('todo_counters')
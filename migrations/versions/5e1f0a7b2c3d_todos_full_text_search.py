@@ -0,0 +1,61 @@
+"""todos full text search
+
+Revision ID: 5e1f0a7b2c3d
+Revises: c9b0cf4bd92c
+Create Date: 2026-10-18 10:41:12.502871
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e1f0a7b2c3d'
+down_revision: Union[str, None] = 'c9b0cf4bd92c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+SQLITE_FTS = [
+    "CREATE VIRTUAL TABLE todos_fts USING fts5(title, description, content='todos', content_rowid='id')",
+    "CREATE TRIGGER todos_fts_ai AFTER INSERT ON todos BEGIN INSERT INTO todos_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+    "CREATE TRIGGER todos_fts_ad AFTER DELETE ON todos BEGIN INSERT INTO todos_fts(todos_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description); END",
+    "CREATE TRIGGER todos_fts_au AFTER UPDATE OF title, description ON todos BEGIN INSERT INTO todos_fts(todos_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description); INSERT INTO todos_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+    "INSERT INTO todos_fts(todos_fts) VALUES ('rebuild')",
+]
+
+
+def upgrade() -> None:
+    dialect = op.get_context().dialect.name
+
+    if dialect == 'sqlite':
+        for statement in SQLITE_FTS:
+            op.execute(statement)
+
+    if dialect == 'postgresql':
+        op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        op.execute('CREATE EXTENSION IF NOT EXISTS btree_gin')
+
+        # GIN builds on a large table take a while; don't block writes.
+        with op.get_context().autocommit_block():
+            op.create_index('ix_todos_search', 'todos', ['user_id', sa.text("to_tsvector('simple', title || ' ' || description)")], postgresql_using='gin', postgresql_concurrently=True)
+            op.create_index('ix_todos_title_trgm', 'todos', ['user_id', 'title'], postgresql_using='gin', postgresql_ops={'title': 'gin_trgm_ops'}, postgresql_concurrently=True)
+            op.create_index('ix_todos_description_trgm', 'todos', ['user_id', 'description'], postgresql_using='gin', postgresql_ops={'description': 'gin_trgm_ops'}, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    dialect = op.get_context().dialect.name
+
+    if dialect == 'sqlite':
+        op.execute('DROP TRIGGER IF EXISTS todos_fts_au')
+        op.execute('DROP TRIGGER IF EXISTS todos_fts_ad')
+        op.execute('DROP TRIGGER IF EXISTS todos_fts_ai')
+        op.execute('DROP TABLE IF EXISTS todos_fts')
+
+    if dialect == 'postgresql':
+        with op.get_context().autocommit_block():
+            op.drop_index('ix_todos_description_trgm', table_name='todos', postgresql_concurrently=True)
+            op.drop_index('ix_todos_title_trgm', table_name='todos', postgresql_concurrently=True)
+            op.drop_index('ix_todos_search', table_name='todos', postgresql_concurrently=True)
@@ -0,0 +1,54 @@
+"""todos user_id on delete cascade
+
+Revision ID: 6f3b8a2e4d19
+Revises: 4a9e2d7c1b60
+Create Date: 2026-10-18 16:05:33.918204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '6f3b8a2e4d19'
+down_revision: Union[str, None] = '4a9e2d7c1b60'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Postgres' name for the constraint created with the todos table.
+FK_NAME = 'todos_user_id_fkey'
+
+# SQLite rebuilds the table to change a foreign key, which drops these.
+SQLITE_FTS_TRIGGERS = [
+    "CREATE TRIGGER todos_fts_ai AFTER INSERT ON todos BEGIN INSERT INTO todos_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+    "CREATE TRIGGER todos_fts_ad AFTER DELETE ON todos BEGIN INSERT INTO todos_fts(todos_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description); END",
+    "CREATE TRIGGER todos_fts_au AFTER UPDATE OF title, description ON todos BEGIN INSERT INTO todos_fts(todos_fts, rowid, title, description) VALUES ('delete', old.id, old.title, old.description); INSERT INTO todos_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+]
+
+
+def _replace_foreign_key(**kw) -> None:
+    if op.get_context().dialect.name == 'sqlite':
+        # The SQLite constraint is unnamed; name it for the rebuild.
+        naming = {'fk': 'todos_%(column_0_name)s_fkey'}
+        with op.batch_alter_table('todos', naming_convention=naming) as batch_op:
+            batch_op.drop_constraint(FK_NAME, type_='foreignkey')
+            batch_op.create_foreign_key(FK_NAME, 'users', ['user_id'], ['id'], **kw)
+
+        for statement in SQLITE_FTS_TRIGGERS:
+            op.execute(statement)
+    else:
+        # Skip the full-table check while the table is locked, then
+        # validate the existing rows without blocking writes.
+        op.drop_constraint(FK_NAME, 'todos', type_='foreignkey')
+        op.create_foreign_key(FK_NAME, 'todos', 'users', ['user_id'], ['id'], postgresql_not_valid=True, **kw)
+        with op.get_context().autocommit_block():
+            op.execute(f'ALTER TABLE todos VALIDATE CONSTRAINT {FK_NAME}')
+
+
+def upgrade() -> None:
+    _replace_foreign_key(ondelete='CASCADE')
+
+
+def downgrade() -> None:
+    _replace_foreign_key()
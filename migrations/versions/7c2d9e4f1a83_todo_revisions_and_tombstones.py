@@ -0,0 +1,50 @@
+"""todo revisions and tombstones
+
+Revision ID: 7c2d9e4f1a83
+Revises: 6f3b8a2e4d19
+Create Date: 2026-10-18 17:02:11.540827
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c2d9e4f1a83'
+down_revision: Union[str, None] = '6f3b8a2e4d19'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Existing todos start at revision 0: a first sync returns them all.
+    op.add_column('todos', sa.Column('revision', sa.Integer(), server_default='0', nullable=False))
+    op.create_table('todo_revisions',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('revision', sa.Integer(), server_default='0', nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id')
+    )
+    op.create_table('todo_tombstones',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('revision', sa.Integer(), nullable=False),
+    sa.Column('todo_id', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'revision', 'todo_id')
+    )
+
+    if op.get_context().dialect.name == 'postgresql':
+        # CREATE INDEX CONCURRENTLY can't run inside a transaction.
+        with op.get_context().autocommit_block():
+            op.create_index('ix_todos_user_id_revision_id', 'todos', ['user_id', 'revision', 'id'], postgresql_concurrently=True)
+    else:
+        op.create_index('ix_todos_user_id_revision_id', 'todos', ['user_id', 'revision', 'id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_todos_user_id_revision_id', table_name='todos')
+    op.drop_table('todo_tombstones')
+    op.drop_table('todo_revisions')
+    op.drop_column('todos', 'revision')
@@ -0,0 +1,52 @@
+"""todos access pattern indexes
+
+Revision ID: 8d4e6b1f9a27
+Revises: 5e1f0a7b2c3d
+Create Date: 2026-10-18 11:20:37.184902
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d4e6b1f9a27'
+down_revision: Union[str, None] = '5e1f0a7b2c3d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _create_indexes(**kw) -> None:
+    active = sa.text("state != 'trash'")
+    trash = sa.text("state = 'trash'")
+
+    op.create_index('ix_todos_user_id_id', 'todos', ['user_id', 'id'], **kw)
+    op.create_index('ix_todos_user_id_updated_at', 'todos', ['user_id', 'updated_at'], **kw)
+    op.create_index('ix_todos_user_id_state_id_active', 'todos', ['user_id', 'state', 'id'], postgresql_where=active, sqlite_where=active, **kw)
+    op.create_index('ix_todos_user_id_id_trash', 'todos', ['user_id', 'id'], postgresql_where=trash, sqlite_where=trash, **kw)
+
+
+def _drop_indexes(**kw) -> None:
+    op.drop_index('ix_todos_user_id_id_trash', table_name='todos', **kw)
+    op.drop_index('ix_todos_user_id_state_id_active', table_name='todos', **kw)
+    op.drop_index('ix_todos_user_id_updated_at', table_name='todos', **kw)
+    op.drop_index('ix_todos_user_id_id', table_name='todos', **kw)
+
+
+def upgrade() -> None:
+    if op.get_context().dialect.name == 'postgresql':
+        # CREATE INDEX CONCURRENTLY can't run inside a transaction.
+        with op.get_context().autocommit_block():
+            _create_indexes(postgresql_concurrently=True)
+    else:
+        _create_indexes()
+
+
+def downgrade() -> None:
+    if op.get_context().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            _drop_indexes(postgresql_concurrently=True)
+    else:
+        _drop_indexes()
@@ -0,0 +1,72 @@
+"""todos sort indexes
+
+Revision ID: 9a5c1e7b3d28
+Revises: 7c2d9e4f1a83
+Create Date: 2026-10-18 18:24:05.913467
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9a5c1e7b3d28'
+down_revision: Union[str, None] = '7c2d9e4f1a83'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _create_sort_indexes(**kw) -> None:
+    op.create_index('ix_todos_user_id_created_at_id', 'todos', ['user_id', 'created_at', 'id'], **kw)
+    op.create_index('ix_todos_user_id_updated_at_id', 'todos', ['user_id', 'updated_at', 'id'], **kw)
+    # A title from before the input limit may be too long for a btree
+    # entry, so only a bounded prefix is indexed (models.todo_title_sort_key).
+    op.create_index('ix_todos_user_id_title_id', 'todos', ['user_id', sa.text('substr(title, 1, 500)'), 'id'], **kw)
+    op.create_index('ix_todos_user_id_state_id', 'todos', ['user_id', 'state', 'id'], **kw)
+
+
+def _drop_sort_indexes(**kw) -> None:
+    op.drop_index('ix_todos_user_id_state_id', table_name='todos', **kw)
+    op.drop_index('ix_todos_user_id_title_id', table_name='todos', **kw)
+    op.drop_index('ix_todos_user_id_updated_at_id', table_name='todos', **kw)
+    op.drop_index('ix_todos_user_id_created_at_id', table_name='todos', **kw)
+
+
+def _create_replaced_indexes(**kw) -> None:
+    active = sa.text("state != 'trash'")
+    trash = sa.text("state = 'trash'")
+
+    op.create_index('ix_todos_user_id_updated_at', 'todos', ['user_id', 'updated_at'], **kw)
+    op.create_index('ix_todos_user_id_state_id_active', 'todos', ['user_id', 'state', 'id'], postgresql_where=active, sqlite_where=active, **kw)
+    op.create_index('ix_todos_user_id_id_trash', 'todos', ['user_id', 'id'], postgresql_where=trash, sqlite_where=trash, **kw)
+
+
+def _drop_replaced_indexes(**kw) -> None:
+    op.drop_index('ix_todos_user_id_id_trash', table_name='todos', **kw)
+    op.drop_index('ix_todos_user_id_state_id_active', table_name='todos', **kw)
+    op.drop_index('ix_todos_user_id_updated_at', table_name='todos', **kw)
+
+
+def upgrade() -> None:
+    # The new indexes are built before the ones they replace are dropped,
+    # so state and updated_at lookups never lose their index.
+    if op.get_context().dialect.name == 'postgresql':
+        # CREATE INDEX CONCURRENTLY can't run inside a transaction.
+        with op.get_context().autocommit_block():
+            _create_sort_indexes(postgresql_concurrently=True)
+            _drop_replaced_indexes(postgresql_concurrently=True)
+    else:
+        _create_sort_indexes()
+        _drop_replaced_indexes()
+
+
+def downgrade() -> None:
+    if op.get_context().dialect.name == 'postgresql':
+        with op.get_context().autocommit_block():
+            _create_replaced_indexes(postgresql_concurrently=True)
+            _drop_sort_indexes(postgresql_concurrently=True)
+    else:
+        _create_replaced_indexes()
+        _drop_sort_indexes()
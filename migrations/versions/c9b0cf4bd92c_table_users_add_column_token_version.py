@@ -0,0 +1,26 @@
+"""table users add column token_version
+
+Revision ID: c9b0cf4bd92c
+Revises: 3619bc901a67
+Create Date: 2026-10-18 10:02:41.118203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c9b0cf4bd92c'
+down_revision: Union[str, None] = '3619bc901a67'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('users', sa.Column('token_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column('users', 'token_version')
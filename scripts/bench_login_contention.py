@@ -0,0 +1,103 @@
+"""Measure GET /todos/ latency while logins run concurrently.
+
+Usage, against a running API:
+
+    python scripts/bench_login_contention.py --base-url http://localhost:8000
+
+Run once with --logins 0 and once with logins to compare the p99.
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+import uuid
+
+import httpx
+
+
+async def _create_user(client: httpx.AsyncClient) -> tuple[str, str]:
+    username = f'bench-{uuid.uuid4().hex[:12]}'
+    password = 'benchmark-password'
+    response = await client.post(
+        '/users/',
+        json={
+            'username': username,
+            'email': f'{username}@bench.com',
+            'password': password,
+        },
+    )
+    response.raise_for_status()
+
+    return username, password
+
+
+async def _login(client: httpx.AsyncClient, username: str, password: str):
+    return await client.post(
+        '/auth/token', data={'username': username, 'password': password}
+    )
+
+
+async def _login_worker(client, username, password, deadline, results):
+    while time.perf_counter() < deadline:
+        response = await _login(client, username, password)
+        results[response.status_code] = (
+            results.get(response.status_code, 0) + 1
+        )
+
+
+async def _probe(client, token, deadline) -> list[float]:
+    latencies = []
+    headers = {'Authorization': f'Bearer {token}'}
+
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        response = await client.get('/todos/', headers=headers)
+        response.raise_for_status()
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    return latencies
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))
+    return ordered[index]
+
+
+async def main(base_url: str, duration: float, logins: int):
+    limits = httpx.Limits(max_connections=logins + 10)
+    async with httpx.AsyncClient(
+        base_url=base_url, limits=limits, timeout=60
+    ) as client:
+        username, password = await _create_user(client)
+        token = (await _login(client, username, password)).json()[
+            'access_token'
+        ]
+
+        deadline = time.perf_counter() + duration
+        login_results: dict[int, int] = {}
+        workers = [
+            _login_worker(client, username, password, deadline, login_results)
+            for _ in range(logins)
+        ]
+        latencies, *_ = await asyncio.gather(
+            _probe(client, token, deadline), *workers
+        )
+
+    print(f'concurrent logins: {logins}')
+    print(f'login responses:   {login_results}')
+    print(f'GET /todos/ requests: {len(latencies)}')
+    print(f'  p50: {statistics.median(latencies):.1f} ms')
+    print(f'  p99: {_percentile(latencies, 99):.1f} ms')
+    print(f'  max: {max(latencies):.1f} ms')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--base-url', default='http://localhost:8000')
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--logins', type=int, default=16)
+    args = parser.parse_args()
+
+    asyncio.run(main(args.base_url, args.duration, args.logins))
@@ -0,0 +1,41 @@
+"""Rebuild the todo_counters table from the todos themselves.
+
+The routers keep the counters in step transactionally; run this after
+writing todos behind their back (manual SQL, restores) or to repair
+drift:
+
+    python scripts/reconcile_todo_counters.py            # every user
+    python scripts/reconcile_todo_counters.py --user-id 42
+"""
+
+import argparse
+import asyncio
+
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from fast_zero.counters import rebuild_todo_counters
+from fast_zero.settings import Settings
+
+
+async def main(database_url: str, user_id: int | None):
+    engine = create_async_engine(database_url)
+
+    async with AsyncSession(engine) as session:
+        await rebuild_todo_counters(session, user_id)
+        await session.commit()
+
+    await engine.dispose()
+    label = f'user {user_id}' if user_id else 'every user'
+    print(f'todo counters rebuilt for {label}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawTextHelpFormatter
+    )
+    parser.add_argument('--database-url', default=None)
+    parser.add_argument('--user-id', type=int, default=None)
+    args = parser.parse_args()
+
+    database_url = args.database_url or Settings().DATABASE_URL
+    asyncio.run(main(database_url, args.user_id))
@@ -1,7 +1,8 @@
 import asyncio
 import sys
-from contextlib import contextmanager
+from contextlib import asynccontextmanager, contextmanager
 from datetime import datetime
+from functools import partial
 
 import pytest
 import pytest_asyncio
@@ -15,9 +16,10 @@ from sqlalchemy.ext.asyncio import (
 from testcontainers.postgres import PostgresContainer
 
 from fast_zero.app import app
-from fast_zero.database import get_session
+from fast_zero.database import get_session, get_session_factory
 from fast_zero.models import User, table_registry
-from fast_zero.security import get_password_hash
+from fast_zero.replicas import get_read_session
+from fast_zero.security import get_password_hash, token_versions
 from tests.factories import UserFactory
 
 if sys.platform == 'win32':
@@ -29,13 +31,27 @@ def client(session: AsyncSession):
     def get_session_override():
         return session
 
+    @asynccontextmanager
+    async def shared_session():
+        yield session
+
     with TestClient(app) as client:
         app.dependency_overrides[get_session] = get_session_override
+        app.dependency_overrides[get_read_session] = get_session_override
+        app.dependency_overrides[get_session_factory] = lambda: shared_session
         yield client
 
     app.dependency_overrides.clear()
 
 
+@pytest.fixture(autouse=True)
+def clear_token_versions():
+    # Ids restart with every test database, so cached versions must not
+    # outlive the test that cached them.
+    yield
+    token_versions.clear()
+
+
 @pytest.fixture(scope='session')
 def engine():
     with PostgresContainer('postgres:16-alpine', driver='psycopg') as postgres:
@@ -75,6 +91,56 @@ def mock_db_time():
     return _mock_db_time
 
 
+@contextmanager
+def _query_budget(session: AsyncSession, *, queries: int, rows: int):
+    """Fail when the block runs more statements or returns more rows
+    than declared. The identity map is cleared first, so every load is
+    counted as it would be in a fresh request."""
+    spent = {'queries': 0, 'rows': 0}
+
+    def count_query(*args):
+        spent['queries'] += 1
+
+    def count_rows(orm_execute_state):
+        if orm_execute_state.execution_options.get('stream_results'):
+            return None
+
+        result = orm_execute_state.invoke_statement()
+        if not getattr(result, 'returns_rows', True):
+            return result
+
+        frozen = result.freeze()
+        spent['rows'] += len(frozen.data)
+
+        return frozen()
+
+    session.sync_session.expunge_all()
+    event.listen(
+        session.bind.sync_engine, 'before_cursor_execute', count_query
+    )
+    event.listen(session.sync_session, 'do_orm_execute', count_rows)
+
+    try:
+        yield spent
+    finally:
+        event.remove(
+            session.bind.sync_engine, 'before_cursor_execute', count_query
+        )
+        event.remove(session.sync_session, 'do_orm_execute', count_rows)
+
+    assert spent['queries'] <= queries, (
+        f'{spent["queries"]} queries executed, budget is {queries}'
+    )
+    assert spent['rows'] <= rows, (
+        f'{spent["rows"]} rows loaded, budget is {rows}'
+    )
+
+
+@pytest.fixture
+def query_budget(session: AsyncSession):
+    return partial(_query_budget, session)
+
+
 @pytest_asyncio.fixture
 async def user(session: AsyncSession) -> User:
     password = 'testtest'
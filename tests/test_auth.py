@@ -16,6 +16,28 @@ def test_get_token(client: TestClient, user):
     assert 'access_token' in token
 
 
+def test_get_token_query_budget(client: TestClient, user, query_budget):
+    with query_budget(queries=1, rows=1):
+        response = client.post(
+            '/auth/token',
+            data={'username': user.username, 'password': user.clean_password},
+        )
+
+    assert response.status_code == HTTPStatus.OK
+
+
+def test_get_token_with_email(client: TestClient, user):
+    response = client.post(
+        '/auth/token',
+        data={
+            'username': user.email.upper(),
+            'password': user.clean_password,
+        },
+    )
+
+    assert response.status_code == HTTPStatus.OK
+
+
 def test_token_wrong_password(client: TestClient, user):
     response = client.post(
         '/auth/token',
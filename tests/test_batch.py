@@ -0,0 +1,162 @@
+from http import HTTPStatus
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from fast_zero.counters import rebuild_todo_counters
+from fast_zero.models import Todo, TodoState
+from fast_zero.routers.batch import settings
+from tests.factories import TodoFactory
+
+NEW_TODO = {'title': 'new', 'description': 'd', 'state': 'todo'}
+
+
+@pytest.mark.asyncio
+async def test_batch_runs_operations_in_one_transaction(
+    client: TestClient, session: AsyncSession, user, token, query_budget
+):
+    patched, deleted = TodoFactory.create_batch(
+        2, user_id=user.id, state=TodoState.todo
+    )
+    session.add_all([patched, deleted])
+    await rebuild_todo_counters(session)
+    await session.commit()
+    headers = {'Authorization': f'Bearer {token}'}
+
+    # Revision bump, one statement per operation, then the tombstones
+    # and counters of the whole batch. SQLite reads the patched todo's
+    # old state in a SELECT of its own.
+    postgres = session.bind.dialect.name == 'postgresql'
+
+    with query_budget(queries=6 if postgres else 7, rows=4 if postgres else 5):
+        response = client.post(
+            '/batch',
+            headers=headers,
+            json={
+                'operations': [
+                    {'op': 'create', 'todo': NEW_TODO},
+                    {
+                        'op': 'patch',
+                        'id': patched.id,
+                        'todo': {'state': 'done'},
+                    },
+                    {'op': 'delete', 'id': deleted.id},
+                ]
+            },
+        )
+
+    assert response.status_code == HTTPStatus.OK
+    batch = response.json()
+    assert batch['committed'] is True
+    assert [result['status'] for result in batch['results']] == [
+        HTTPStatus.CREATED,
+        HTTPStatus.OK,
+        HTTPStatus.OK,
+    ]
+    assert batch['results'][0]['todo']['title'] == NEW_TODO['title']
+    assert batch['results'][1]['todo']['state'] == 'done'
+
+    stats = client.get('/todos/stats', headers=headers).json()
+    assert stats['by_state'] == {
+        'draft': 0,
+        'todo': 1,
+        'doing': 0,
+        'done': 1,
+        'trash': 0,
+    }
+    changes = client.get('/todos/changes', headers=headers).json()
+    assert changes['deleted'] == [deleted.id]
+
+
+@pytest.mark.asyncio
+async def test_atomic_batch_rolls_back_on_the_first_failure(
+    client: TestClient, session: AsyncSession, token
+):
+    response = client.post(
+        '/batch',
+        headers={'Authorization': f'Bearer {token}'},
+        json={
+            'operations': [
+                {'op': 'create', 'todo': NEW_TODO},
+                {'op': 'delete', 'id': 999},
+                {'op': 'create', 'todo': NEW_TODO},
+            ]
+        },
+    )
+
+    batch = response.json()
+    assert batch['committed'] is False
+    assert [result['status'] for result in batch['results']] == [
+        HTTPStatus.FAILED_DEPENDENCY,
+        HTTPStatus.NOT_FOUND,
+        HTTPStatus.FAILED_DEPENDENCY,
+    ]
+    assert await session.scalar(select(Todo)) is None
+
+
+@pytest.mark.asyncio
+async def test_atomic_batch_validates_before_writing(
+    client: TestClient, session: AsyncSession, token, query_budget
+):
+    with query_budget(queries=0, rows=0):
+        response = client.post(
+            '/batch',
+            headers={'Authorization': f'Bearer {token}'},
+            json={
+                'operations': [
+                    {'op': 'create', 'todo': NEW_TODO},
+                    {'op': 'create', 'todo': {'title': 'no state'}},
+                ]
+            },
+        )
+
+    batch = response.json()
+    assert batch['committed'] is False
+    assert batch['results'][1]['status'] == HTTPStatus.UNPROCESSABLE_ENTITY
+    assert batch['results'][1]['detail'].startswith('create.todo.')
+
+
+def test_continue_batch_skips_failed_operations(client: TestClient, token):
+    expected_todos = 2
+    headers = {'Authorization': f'Bearer {token}'}
+
+    response = client.post(
+        '/batch',
+        headers=headers,
+        json={
+            'mode': 'continue',
+            'operations': [
+                {'op': 'create', 'todo': NEW_TODO},
+                {'op': 'archive', 'id': 1},
+                {'op': 'patch', 'id': 999, 'todo': {'state': 'done'}},
+                {'op': 'create', 'todo': NEW_TODO},
+            ],
+        },
+    )
+
+    batch = response.json()
+    assert batch['committed'] is True
+    assert [result['status'] for result in batch['results']] == [
+        HTTPStatus.CREATED,
+        HTTPStatus.UNPROCESSABLE_ENTITY,
+        HTTPStatus.NOT_FOUND,
+        HTTPStatus.CREATED,
+    ]
+    todos = client.get('/todos/', headers=headers).json()['todos']
+    assert len(todos) == expected_todos
+
+
+def test_batch_rejects_too_many_operations(client: TestClient, token):
+    operations = [{'op': 'delete', 'id': 1}] * (
+        settings.BATCH_MAX_OPERATIONS + 1
+    )
+
+    response = client.post(
+        '/batch',
+        headers={'Authorization': f'Bearer {token}'},
+        json={'operations': operations},
+    )
+
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
@@ -0,0 +1,31 @@
+import asyncio
+
+import pytest
+
+from fast_zero.broker import MemoryBroker
+
+
+@pytest.mark.asyncio
+async def test_memory_broker_wakes_only_that_users_subscribers():
+    broker = MemoryBroker()
+
+    async with broker.subscribe(1) as mine, broker.subscribe(2) as theirs:
+        await broker.publish(1)
+        await asyncio.wait_for(mine.wait(), 1)
+
+        assert mine.is_set()
+        assert not theirs.is_set()
+
+    assert not broker._subscribers
+
+
+@pytest.mark.asyncio
+async def test_memory_broker_wake_all():
+    broker = MemoryBroker()
+
+    async with broker.subscribe(1) as first, broker.subscribe(2) as second:
+        broker.wake_all()
+        await asyncio.sleep(0)
+
+        assert first.is_set()
+        assert second.is_set()
@@ -2,7 +2,9 @@ from dataclasses import asdict
 
 import pytest
 from sqlalchemy import select
+from sqlalchemy.exc import InvalidRequestError
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 
 from fast_zero.models import Todo, User
 
@@ -19,7 +21,9 @@ async def test_create_user(session: AsyncSession, mock_db_time):
         await session.commit()
 
         user = await session.scalar(
-            select(User).where(User.username == 'neville')
+            select(User)
+            .where(User.username == 'neville')
+            .options(selectinload(User.todos))
         )
 
         assert asdict(user) == {
@@ -27,6 +31,7 @@ async def test_create_user(session: AsyncSession, mock_db_time):
             'username': 'neville',
             'password': 'minha_senha-123',
             'email': 'leo@ville.com',
+            'token_version': 0,
             'created_at': time,
             'updated_at': time,
             'todos': [],
@@ -52,6 +57,7 @@ async def test_create_todo(session: AsyncSession, user: User, mock_db_time):
             'description': 'Test Desc',
             'id': 1,
             'state': 'draft',
+            'revision': 0,
             'title': 'Test Todo',
             'user_id': 1,
             'created_at': time,
@@ -72,6 +78,22 @@ async def test_user_todo_relationship(session: AsyncSession, user: User):
     await session.commit()
     await session.refresh(user)
 
-    user = await session.scalar(select(User).where(User.id == user.id))
+    user = await session.scalar(
+        select(User)
+        .where(User.id == user.id)
+        .options(selectinload(User.todos))
+    )
 
     assert user.todos == [todo]
+
+
+@pytest.mark.asyncio
+async def test_user_todos_are_not_loaded_by_default(
+    session: AsyncSession, user: User
+):
+    session.expunge_all()
+
+    user = await session.scalar(select(User).where(User.id == user.id))
+
+    with pytest.raises(InvalidRequestError):
+        user.todos
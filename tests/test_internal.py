@@ -0,0 +1,81 @@
+from http import HTTPStatus
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import exc, text
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+from fast_zero import database
+from fast_zero.database import InstrumentedPool, pool_stats
+from fast_zero.routers import internal
+
+
+@pytest.fixture
+def internal_token(monkeypatch):
+    monkeypatch.setattr(internal.settings, 'INTERNAL_TOKEN', 'scraper')
+    return 'scraper'
+
+
+def test_read_pool_stats(client: TestClient, internal_token, monkeypatch):
+    monkeypatch.setattr(internal, 'replica_engines', [database.engine])
+
+    response = client.get(
+        '/internal/pool',
+        headers={'Authorization': f'Bearer {internal_token}'},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    stats = response.json()
+    assert stats['checked_out'] >= 0
+    assert list(stats['wait_seconds']['buckets'])[-1] == '+Inf'
+    assert [replica['size'] for replica in stats['replicas']] == [
+        stats['size']
+    ]
+
+
+@pytest.mark.parametrize('headers', [{}, {'Authorization': 'Bearer wrong'}])
+def test_read_pool_stats_requires_the_internal_token(
+    client: TestClient, internal_token, headers
+):
+    response = client.get('/internal/pool', headers=headers)
+
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+
+def test_internal_routes_hidden_without_a_token_configured(
+    client: TestClient,
+):
+    response = client.get(
+        '/internal/pool', headers={'Authorization': 'Bearer anything'}
+    )
+
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+@pytest.mark.asyncio
+async def test_instrumented_pool_counts_checkouts_and_failures(
+    engine: AsyncEngine,
+):
+    pooled = create_async_engine(
+        engine.url,
+        poolclass=InstrumentedPool,
+        pool_size=1,
+        max_overflow=0,
+        pool_timeout=0.01,
+    )
+
+    async with pooled.connect() as conn:
+        await conn.execute(text('SELECT 1'))
+        stats = pool_stats(pooled.pool)
+        assert stats['checked_out'] == 1
+
+        with pytest.raises(exc.TimeoutError):
+            await pooled.connect().start()
+
+    stats = pool_stats(pooled.pool)
+    await pooled.dispose()
+
+    assert stats['checked_out'] == 0
+    assert stats['idle'] == 1
+    assert stats['failures'] == 1
+    assert stats['wait_seconds']['buckets']['+Inf'] == stats['checkouts']
@@ -0,0 +1,127 @@
+from http import HTTPStatus
+from types import SimpleNamespace
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette.requests import Request
+
+from fast_zero import replicas
+from fast_zero.database import engine
+from fast_zero.replicas import (
+    PIN_COOKIE,
+    PIN_HEADER,
+    ReplicaSelector,
+    is_pinned,
+    pin_token,
+    read_engine,
+)
+
+
+def fake_engine(checked_out: int):
+    return SimpleNamespace(
+        pool=SimpleNamespace(checkedout=lambda: checked_out)
+    )
+
+
+def fake_request(token: str, **headers):
+    headers['Authorization'] = f'Bearer {token}'
+    return Request({
+        'type': 'http',
+        'headers': [
+            (name.lower().encode(), value.encode())
+            for name, value in headers.items()
+        ],
+    })
+
+
+@pytest.fixture
+def two_replicas(monkeypatch):
+    engines = [fake_engine(3), fake_engine(1)]
+    monkeypatch.setattr(
+        replicas,
+        'replica_selector',
+        ReplicaSelector(engines, 'round_robin'),
+    )
+    return engines
+
+
+def test_round_robin_cycles_replicas():
+    engines = [fake_engine(0), fake_engine(0)]
+    selector = ReplicaSelector(engines, 'round_robin')
+
+    assert [selector.choose() for _ in range(3)] == [
+        engines[0],
+        engines[1],
+        engines[0],
+    ]
+
+
+def test_least_connections_picks_idlest_replica():
+    engines = [fake_engine(3), fake_engine(1), fake_engine(2)]
+    selector = ReplicaSelector(engines, 'least_connections')
+
+    assert selector.choose() is engines[1]
+
+
+def test_read_engine_without_replicas_is_primary():
+    assert read_engine(pinned=False) is engine
+
+
+def test_read_engine_sends_pinned_reads_to_primary(two_replicas):
+    assert read_engine(pinned=False) in two_replicas
+    assert read_engine(pinned=True) is engine
+
+
+def test_pin_from_header_or_cookie(user, token):
+    pin = pin_token(user.id)
+
+    assert is_pinned(fake_request(token, **{PIN_HEADER: pin}))
+    assert is_pinned(fake_request(token, Cookie=f'{PIN_COOKIE}={pin}'))
+    assert not is_pinned(fake_request(token))
+
+
+def test_pin_expires(monkeypatch, user, token):
+    monkeypatch.setattr(replicas.settings, 'READ_YOUR_WRITES_SECONDS', -1)
+
+    pin = pin_token(user.id)
+
+    assert not is_pinned(fake_request(token, **{PIN_HEADER: pin}))
+
+
+def test_pin_belongs_to_its_user(user, other_user, token):
+    pin = pin_token(other_user.id)
+
+    assert not is_pinned(fake_request(token, **{PIN_HEADER: pin}))
+    assert not is_pinned(fake_request(token, **{PIN_HEADER: 'forged'}))
+
+
+def test_successful_write_pins_client(
+    client: TestClient, user, token, two_replicas
+):
+    response = client.get(
+        '/todos/', headers={'Authorization': f'Bearer {token}'}
+    )
+    assert PIN_HEADER not in response.headers
+
+    response = client.post(
+        '/todos/',
+        json={'title': 't', 'description': 'd', 'state': 'draft'},
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.CREATED
+    pin = response.headers[PIN_HEADER]
+    assert response.cookies[PIN_COOKIE] == pin
+    assert is_pinned(fake_request(token, **{PIN_HEADER: pin}))
+
+
+def test_failed_write_does_not_pin_client(
+    client: TestClient, user, token, two_replicas
+):
+    response = client.delete(
+        '/todos/10', headers={'Authorization': f'Bearer {token}'}
+    )
+
+    assert response.status_code == HTTPStatus.NOT_FOUND
+    assert PIN_HEADER not in response.headers
+    assert PIN_COOKIE not in response.cookies
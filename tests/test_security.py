@@ -1,9 +1,23 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from http import HTTPStatus
 
+import pytest
+from fastapi import HTTPException
 from fastapi.testclient import TestClient
 from jwt import decode
 
-from fast_zero.security import create_access_token, settings
+from fast_zero.security import (
+    PasswordHasher,
+    create_access_token,
+    password_hasher,
+    remember_token_version,
+    settings,
+    token_versions,
+    user_claims,
+)
 
 
 def test_jwt():
@@ -18,6 +32,123 @@ def test_jwt():
     assert result['exp']
 
 
+def test_user_claims_carry_id_and_token_version(user):
+    assert user_claims(user) == {
+        'sub': user.username,
+        'uid': user.id,
+        'ver': user.token_version,
+    }
+
+
+def test_get_current_user_token_without_user_id(client: TestClient, user):
+    token = create_access_token({'sub': user.username})
+
+    response = client.get(
+        '/users/', headers={'Authorization': f'Bearer {token}'}
+    )
+
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+    assert response.json() == {'detail': 'Could not validate credentials'}
+
+
+def test_get_current_user_outdated_token_version(client: TestClient, user):
+    token = create_access_token({**user_claims(user), 'ver': -1})
+
+    response = client.get(
+        '/users/', headers={'Authorization': f'Bearer {token}'}
+    )
+
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+    assert token_versions[user.id][0] == user.token_version
+
+
+def test_principal_rejected_after_user_update(client: TestClient, user, token):
+    response = client.put(
+        f'/users/{user.id}',
+        headers={'Authorization': f'Bearer {token}'},
+        json={
+            'username': 'renamed',
+            'email': 'renamed@example.com',
+            'password': 'newpassword',
+        },
+    )
+    assert response.status_code == HTTPStatus.OK
+
+    response = client.get(
+        '/todos/', headers={'Authorization': f'Bearer {token}'}
+    )
+
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+    assert response.json() == {'detail': 'Could not validate credentials'}
+
+
+def test_principal_rejected_after_user_delete(client: TestClient, user, token):
+    response = client.delete(
+        f'/users/{user.id}', headers={'Authorization': f'Bearer {token}'}
+    )
+    assert response.status_code == HTTPStatus.OK
+
+    response = client.get(
+        '/todos/', headers={'Authorization': f'Bearer {token}'}
+    )
+
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+
+@pytest.mark.asyncio
+async def test_principal_rejected_once_cached_version_expires(
+    client: TestClient, session, user, token
+):
+    # Another worker bumped the version, and this one's cache expired.
+    user.token_version += 1
+    await session.commit()
+    token_versions.clear()
+
+    response = client.get(
+        '/todos/', headers={'Authorization': f'Bearer {token}'}
+    )
+
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+    assert token_versions[user.id][0] == user.token_version
+
+
+@pytest.mark.asyncio
+async def test_todo_write_for_user_deleted_elsewhere(
+    client: TestClient, session, user, token
+):
+    # Deleted on another worker while this one still trusts the token.
+    await session.delete(user)
+    await session.commit()
+
+    response = client.post(
+        '/todos/',
+        headers={'Authorization': f'Bearer {token}'},
+        json={'title': 'Test', 'description': 'Test', 'state': 'draft'},
+    )
+
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+    assert response.json() == {'detail': 'Could not validate credentials'}
+
+
+def test_token_version_cache_is_bounded(monkeypatch):
+    monkeypatch.setattr(settings, 'TOKEN_VERSION_CACHE_SIZE', 2)
+
+    for user_id in (1, 2, 3):
+        remember_token_version(user_id, 0)
+
+    assert list(token_versions) == [2, 3]
+
+
+def test_token_version_cache_drops_expired_entries(monkeypatch):
+    remember_token_version(1, 0)
+    later = time.monotonic() + settings.TOKEN_VERSION_CACHE_SECONDS
+    monkeypatch.setattr(time, 'monotonic', lambda: later)
+
+    remember_token_version(2, 0)
+
+    assert list(token_versions) == [2]
+
+
 def test_jwt_invalid_token(client: TestClient, user):
     response = client.delete(
         f'/users/{user.id}', headers={'Authorization': 'Bearer token-invalido'}
@@ -40,7 +171,7 @@ def test_get_current_user_not_found(client: TestClient):
 
 
 def test_get_current_user_does_not_exists(client: TestClient):
-    data = {'sub': 'nonuser'}
+    data = {'sub': 'nonuser', 'uid': 999, 'ver': 0}
     token = create_access_token(data)
 
     response = client.get(
@@ -49,3 +180,32 @@ def test_get_current_user_does_not_exists(client: TestClient):
 
     assert response.status_code == HTTPStatus.UNAUTHORIZED
     assert response.json() == {'detail': 'Could not validate credentials'}
+
+
+@pytest.mark.asyncio
+async def test_password_hasher_hash_and_verify():
+    hashed = await password_hasher.hash('secret')
+
+    assert hashed != 'secret'
+    assert await password_hasher.verify('secret', hashed)
+    assert not await password_hasher.verify('wrong', hashed)
+
+
+@pytest.mark.asyncio
+async def test_password_hasher_rejects_when_queue_is_full():
+    release = threading.Event()
+    hasher = PasswordHasher(ThreadPoolExecutor(max_workers=1), max_pending=1)
+
+    blocked = asyncio.create_task(hasher._run(release.wait))
+    await asyncio.sleep(0)
+
+    with pytest.raises(HTTPException) as exc_info:
+        await hasher.hash('secret')
+
+    assert exc_info.value.status_code == HTTPStatus.SERVICE_UNAVAILABLE
+    assert exc_info.value.headers == {'Retry-After': '1'}
+
+    release.set()
+    await blocked
+
+    assert await hasher.verify('secret', await hasher.hash('secret'))
@@ -1,10 +1,41 @@
+import csv
+import json
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime
 from http import HTTPStatus
 
 import pytest
+from fastapi import HTTPException, WebSocketDisconnect, status
 from fastapi.testclient import TestClient
+from sqlalchemy import func, insert, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from fast_zero import importer
+from fast_zero.broker import MemoryBroker
+from fast_zero.counters import rebuild_todo_counters
 from fast_zero.models import Todo, TodoState
+from fast_zero.routers.todo import (
+    selection_filters,
+    server_sent_events,
+    settings,
+    stream_start,
+    todo_change_events,
+    todo_list_query,
+)
+from fast_zero.schemas import (
+    PAGE_MAX_LIMIT,
+    TITLE_MAX_LENGTH,
+    FilterTodo,
+    TodoPublic,
+    TodoRow,
+    TodoSelection,
+)
+from fast_zero.security import (
+    create_access_token,
+    remember_token_version,
+    user_claims,
+)
 from tests.factories import TodoFactory
 
 
@@ -34,6 +65,69 @@ def test_create_todo(
         }
 
 
+def test_create_todo_query_budget(client: TestClient, token, query_budget):
+    # The revision bump, INSERT ... RETURNING and the counter upsert, no
+    # refresh SELECT.
+    with query_budget(queries=3, rows=1):
+        response = client.post(
+            '/todos/',
+            headers={'Authorization': f'Bearer {token}'},
+            json={'title': 't', 'description': 'd', 'state': 'draft'},
+        )
+
+    assert response.status_code == HTTPStatus.CREATED
+    assert response.json()['created_at'] is not None
+
+
+def test_create_todos_bulk_keeps_input_order(
+    client: TestClient, session: AsyncSession, token, query_budget
+):
+    payload = [
+        {'title': f'Todo {n}', 'description': 'bulk', 'state': 'todo'}
+        for n in range(3)
+    ]
+    # Plus the revision bump and the counter upsert. SQLite can't return
+    # rows of a multi-row INSERT in input order, so SQLAlchemy runs one
+    # statement per row.
+    queries = 3 if session.bind.dialect.name == 'postgresql' else 5
+
+    with query_budget(queries=queries, rows=4):
+        response = client.post(
+            '/todos/bulk',
+            headers={'Authorization': f'Bearer {token}'},
+            json=payload,
+        )
+
+    assert response.status_code == HTTPStatus.CREATED
+    todos = response.json()
+    assert [todo['title'] for todo in todos] == ['Todo 0', 'Todo 1', 'Todo 2']
+    assert [todo['id'] for todo in todos] == [1, 2, 3]
+    assert all(todo['created_at'] for todo in todos)
+
+
+def test_create_todos_bulk_empty_list(client: TestClient, token):
+    response = client.post(
+        '/todos/bulk',
+        headers={'Authorization': f'Bearer {token}'},
+        json=[],
+    )
+
+    assert response.status_code == HTTPStatus.CREATED
+    assert response.json() == []
+
+
+def test_create_todos_bulk_over_max_size(client: TestClient, token):
+    todo = {'title': 'Todo', 'description': 'bulk', 'state': 'todo'}
+
+    response = client.post(
+        '/todos/bulk',
+        headers={'Authorization': f'Bearer {token}'},
+        json=[todo] * (settings.TODO_BULK_MAX_SIZE + 1),
+    )
+
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
 @pytest.mark.asyncio
 async def test_list_todos_should_return_5_todos(
     client: TestClient, session: AsyncSession, user, token
@@ -51,6 +145,177 @@ async def test_list_todos_should_return_5_todos(
     assert len(response.json()['todos']) == expected_todos
 
 
+@pytest.mark.asyncio
+async def test_list_todos_query_budget(
+    client: TestClient, session: AsyncSession, user, token, query_budget
+):
+    session.add_all(TodoFactory.create_batch(5, user_id=user.id))
+    await session.commit()
+
+    with query_budget(queries=2, rows=6):
+        response = client.get(
+            '/todos/',
+            headers={'Authorization': f'Bearer {token}'},
+        )
+
+    assert response.status_code == HTTPStatus.OK
+
+
+@pytest.mark.asyncio
+async def test_list_todos_with_fields(
+    client: TestClient, session: AsyncSession, user, token
+):
+    todo = TodoFactory(user_id=user.id, state=TodoState.doing)
+    session.add(todo)
+    await session.commit()
+    headers = {'Authorization': f'Bearer {token}'}
+
+    response = client.get('/todos/?fields=state', headers=headers)
+
+    assert response.json()['todos'] == [{'id': todo.id, 'state': 'doing'}]
+    assert (
+        response.headers['etag']
+        != (client.get('/todos/', headers=headers).headers['etag'])
+    )
+
+
+def test_list_todos_selects_only_the_requested_columns():
+    query, _ = todo_list_query(
+        1, FilterTodo(), 'sqlite', (Todo.id, Todo.state)
+    )
+
+    assert 'description' not in str(query)
+
+
+def test_list_todos_rejects_unknown_fields(client: TestClient, token):
+    response = client.get(
+        '/todos/?fields=state,owner',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert response.json() == {'detail': 'Unknown fields: owner'}
+
+
+@pytest.mark.asyncio
+async def test_list_todos_order_by_title_desc_pages_with_cursor(
+    client: TestClient, session: AsyncSession, user, token
+):
+    for title in ('b', 'a', 'c', 'b'):
+        session.add(TodoFactory(user_id=user.id, title=title))
+    await session.commit()
+    headers = {'Authorization': f'Bearer {token}'}
+
+    url = '/todos/?order_by=title&direction=desc&limit=3'
+    first_page = client.get(url, headers=headers).json()
+    second_page = client.get(
+        f'{url}&cursor={first_page["next_cursor"]}', headers=headers
+    ).json()
+
+    titles = [t['title'] for t in first_page['todos'] + second_page['todos']]
+    assert second_page['next_cursor'] is None
+
+    assert titles == ['c', 'b', 'b', 'a']
+
+
+@pytest.mark.asyncio
+async def test_list_todos_created_range(
+    client: TestClient, session: AsyncSession, user, token
+):
+    todos = TodoFactory.create_batch(3, user_id=user.id)
+    session.add_all(todos)
+    await session.commit()
+    for day, todo in enumerate(todos, start=1):
+        await session.execute(
+            update(Todo)
+            .where(Todo.id == todo.id)
+            .values(created_at=datetime(2025, 1, day))
+        )
+    await session.commit()
+
+    response = client.get(
+        '/todos/?order_by=created_at'
+        '&created_after=2025-01-02T00:00:00&created_before=2025-01-04',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert [todo['id'] for todo in response.json()['todos']] == [
+        todos[1].id,
+        todos[2].id,
+    ]
+
+
+@pytest.mark.parametrize(
+    'query',
+    [
+        'created_after=2025-01-01',
+        'order_by=title&updated_before=2025-01-01',
+        'q=milk&order_by=title',
+    ],
+)
+def test_list_todos_rejects_orders_no_index_serves(
+    client: TestClient, token, query
+):
+    response = client.get(
+        f'/todos/?{query}', headers={'Authorization': f'Bearer {token}'}
+    )
+
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+def test_todo_row_matches_todo_public():
+    assert TodoRow.__annotations__.keys() == TodoPublic.model_fields.keys()
+
+
+@pytest.mark.asyncio
+async def test_list_todos_not_modified(
+    client: TestClient, session: AsyncSession, user, token, query_budget
+):
+    session.add_all(TodoFactory.create_batch(5, user_id=user.id))
+    await session.commit()
+    headers = {'Authorization': f'Bearer {token}'}
+
+    etag = client.get('/todos/', headers=headers).headers['etag']
+
+    with query_budget(queries=1, rows=1):
+        response = client.get(
+            '/todos/', headers={**headers, 'If-None-Match': etag}
+        )
+
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+    assert response.headers['etag'] == etag
+    assert not response.content
+
+
+@pytest.mark.asyncio
+async def test_list_todos_etag_changes_with_filters_and_writes(
+    client: TestClient, session: AsyncSession, user, token
+):
+    expected_todos = 3
+    session.add_all(TodoFactory.create_batch(2, user_id=user.id))
+    await session.commit()
+    headers = {'Authorization': f'Bearer {token}'}
+    etag = client.get('/todos/', headers=headers).headers['etag']
+
+    response = client.get(
+        '/todos/?limit=1', headers={**headers, 'If-None-Match': etag}
+    )
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['etag'] != etag
+
+    client.post(
+        '/todos/',
+        json={'title': 't', 'description': 'd', 'state': 'draft'},
+        headers=headers,
+    )
+
+    response = client.get(
+        '/todos/', headers={**headers, 'If-None-Match': etag}
+    )
+    assert response.status_code == HTTPStatus.OK
+    assert len(response.json()['todos']) == expected_todos
+
+
 @pytest.mark.asyncio
 async def test_list_todos_pagination_should_return_2_todos(
     client: TestClient, session: AsyncSession, user, token
@@ -68,6 +333,53 @@ async def test_list_todos_pagination_should_return_2_todos(
     assert len(response.json()['todos']) == expected_todos
 
 
+@pytest.mark.parametrize(
+    'page', ['limit=-3', f'limit={PAGE_MAX_LIMIT + 1}', 'offset=-1']
+)
+def test_list_todos_rejects_page_out_of_bounds(
+    client: TestClient, token, page
+):
+    response = client.get(
+        f'/todos/?{page}', headers={'Authorization': f'Bearer {token}'}
+    )
+
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+@pytest.mark.asyncio
+async def test_list_todos_cursor_pagination_walks_all_pages(
+    client: TestClient, session: AsyncSession, user, token
+):
+    expected_ids = list(range(1, 6))
+    session.add_all(TodoFactory.create_batch(5, user_id=user.id))
+    await session.commit()
+
+    ids, cursor = [], ''
+    while cursor is not None:
+        response = client.get(
+            f'/todos/?limit=2&cursor={cursor}'
+            if cursor
+            else '/todos/?limit=2',
+            headers={'Authorization': f'Bearer {token}'},
+        )
+        assert response.status_code == HTTPStatus.OK
+        ids += [todo['id'] for todo in response.json()['todos']]
+        cursor = response.json()['next_cursor']
+
+    assert ids == expected_ids
+
+
+@pytest.mark.parametrize('cursor', ['not-a-cursor', 'WyJhYmMiXQ', 'W10'])
+def test_list_todos_invalid_cursor(client: TestClient, token, cursor):
+    response = client.get(
+        f'/todos/?cursor={cursor}',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert response.json() == {'detail': 'Invalid cursor'}
+
+
 @pytest.mark.asyncio
 @pytest.mark.parametrize(
     ('filter_field', 'filter_value'),
@@ -146,6 +458,79 @@ async def test_list_todos_filter_combined_should_return_5_todos(
     assert len(response.json()['todos']) == expected_todos
 
 
+@pytest.mark.asyncio
+async def test_list_todos_search_ranks_best_match_first(
+    client: TestClient, session: AsyncSession, user, other_user, token
+):
+    session.add_all([
+        TodoFactory(user_id=user.id, title='buy milk', description='store'),
+        TodoFactory(user_id=user.id, title='walk', description='the dog'),
+        TodoFactory(user_id=user.id, title='milk', description='milk cow'),
+        TodoFactory(user_id=other_user.id, title='milk', description='milk'),
+    ])
+    await session.commit()
+
+    response = client.get(
+        '/todos/?q=milk',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert [todo['title'] for todo in response.json()['todos']] == [
+        'milk',
+        'buy milk',
+    ]
+
+
+@pytest.mark.asyncio
+async def test_list_todos_search_cursor_pagination(
+    client: TestClient, session: AsyncSession, user, token
+):
+    expected_todos = 5
+    session.add_all(
+        TodoFactory.create_batch(5, user_id=user.id, title='sync backend')
+    )
+    await session.commit()
+
+    ids, cursor = [], None
+    for _ in range(3):
+        query = f'&cursor={cursor}' if cursor else ''
+        response = client.get(
+            f'/todos/?q=backend&limit=2{query}',
+            headers={'Authorization': f'Bearer {token}'},
+        )
+        ids += [todo['id'] for todo in response.json()['todos']]
+        cursor = response.json()['next_cursor']
+
+    assert cursor is None
+    assert len(set(ids)) == expected_todos
+
+
+@pytest.mark.asyncio
+async def test_list_todos_search_sees_patched_title(
+    client: TestClient, session: AsyncSession, user, token
+):
+    todo = TodoFactory(user_id=user.id, title='old', description='text')
+    session.add(todo)
+    await session.commit()
+
+    client.patch(
+        f'/todos/{todo.id}',
+        json={'title': 'renamed'},
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    old = client.get(
+        '/todos/?q=old', headers={'Authorization': f'Bearer {token}'}
+    )
+    new = client.get(
+        '/todos/?q=renamed', headers={'Authorization': f'Bearer {token}'}
+    )
+
+    assert old.json()['todos'] == []
+    assert [t['id'] for t in new.json()['todos']] == [todo.id]
+
+
 @pytest.mark.asyncio
 async def test_delete_todo(
     client: TestClient, session: AsyncSession, user, token
@@ -165,6 +550,40 @@ async def test_delete_todo(
     }
 
 
+@pytest.mark.asyncio
+async def test_delete_todo_query_budget(
+    client: TestClient, session: AsyncSession, user, token, query_budget
+):
+    todo = TodoFactory(user_id=user.id)
+    session.add(todo)
+    await session.commit()
+
+    # Revision bump, DELETE ... RETURNING, tombstone and counter upsert.
+    with query_budget(queries=4, rows=2):
+        response = client.delete(
+            f'/todos/{todo.id}',
+            headers={'Authorization': f'Bearer {token}'},
+        )
+
+    assert response.status_code == HTTPStatus.OK
+
+
+@pytest.mark.asyncio
+async def test_delete_todo_of_other_user(
+    client: TestClient, session: AsyncSession, other_user, token
+):
+    todo = TodoFactory(user_id=other_user.id)
+    session.add(todo)
+    await session.commit()
+
+    response = client.delete(
+        f'/todos/{todo.id}',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+
 def test_delete_todo_error(client: TestClient, token):
     response = client.delete(
         '/todos/490',
@@ -193,6 +612,47 @@ async def test_patch_todo(
     assert response.json()['title'] == 'teste!'
 
 
+@pytest.mark.asyncio
+async def test_patch_todo_query_budget(
+    client: TestClient, session: AsyncSession, user, token, query_budget
+):
+    todo = TodoFactory(user_id=user.id)
+    session.add(todo)
+    await session.commit()
+
+    # Revision bump, UPDATE ... RETURNING the old state too, then the
+    # counter upsert. SQLite reads the old state in a SELECT of its own.
+    postgres = session.bind.dialect.name == 'postgresql'
+
+    with query_budget(queries=3 if postgres else 4, rows=2 if postgres else 3):
+        response = client.patch(
+            f'/todos/{todo.id}',
+            json={'state': 'done'},
+            headers={'Authorization': f'Bearer {token}'},
+        )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['state'] == 'done'
+
+
+@pytest.mark.asyncio
+async def test_patch_todo_without_changes(
+    client: TestClient, session: AsyncSession, user, token
+):
+    todo = TodoFactory(user_id=user.id)
+    session.add(todo)
+    await session.commit()
+
+    response = client.patch(
+        f'/todos/{todo.id}',
+        json={},
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['title'] == todo.title
+
+
 def test_patch_todo_error(client: TestClient, token):
     response = client.patch(
         '/todos/490',
@@ -204,21 +664,527 @@ def test_patch_todo_error(client: TestClient, token):
 
 
 @pytest.mark.asyncio
-async def test_list_todos_should_return_all_expected_fields(  # noqa
-    client: TestClient, session: AsyncSession, user, token, mock_db_time
+async def test_patch_todos_by_ids(
+    client: TestClient, session: AsyncSession, user, token, query_budget
 ):
-    with mock_db_time(model=Todo) as time:
-        todo = TodoFactory.create(user_id=user.id)
-        session.add(todo)
-        await session.commit()
+    expected_affected = 2
+    todos = TodoFactory.create_batch(3, user_id=user.id, state=TodoState.todo)
+    session.add_all(todos)
+    await session.commit()
+    # SQLite reads the old states in a SELECT of its own.
+    postgres = session.bind.dialect.name == 'postgresql'
 
-        await session.refresh(todo)
-        response = client.get(
-            '/todos/',
+    with query_budget(queries=3 if postgres else 4, rows=3 if postgres else 5):
+        response = client.patch(
+            f'/todos/?ids={todos[0].id}&ids={todos[2].id}',
+            json={'state': 'done'},
             headers={'Authorization': f'Bearer {token}'},
         )
 
-        assert response.json()['todos'] == [
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['affected'] == expected_affected
+    assert sorted(response.json()['ids']) == [todos[0].id, todos[2].id]
+
+    response = client.get(
+        '/todos/?state=done', headers={'Authorization': f'Bearer {token}'}
+    )
+    assert [t['id'] for t in response.json()['todos']] == [
+        todos[0].id,
+        todos[2].id,
+    ]
+
+
+@pytest.mark.asyncio
+async def test_patch_todos_state_scales_linearly(
+    client: TestClient, session: AsyncSession, user, token, query_budget
+):
+    expected_affected = 20_000
+    await session.execute(
+        insert(Todo),
+        [
+            {
+                'title': f'Todo {n}',
+                'description': 'd',
+                'state': TodoState.todo,
+                'user_id': user.id,
+            }
+            for n in range(expected_affected)
+        ],
+    )
+    await session.commit()
+    postgres = session.bind.dialect.name == 'postgresql'
+
+    # Looking each row's old state up in the CTE took ~9s here.
+    max_seconds = 3
+    start = time.perf_counter()
+    with query_budget(
+        queries=3 if postgres else 4,
+        rows=(1 if postgres else 2) * expected_affected + 1,
+    ):
+        response = client.patch(
+            '/todos/?state=todo',
+            json={'state': 'done'},
+            headers={'Authorization': f'Bearer {token}'},
+        )
+    elapsed = time.perf_counter() - start
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['affected'] == expected_affected
+    assert elapsed < max_seconds, f'took {elapsed:.2f}s'
+
+
+@pytest.mark.asyncio
+async def test_patch_todos_by_filter_is_scoped_to_user(
+    client: TestClient, session: AsyncSession, user, other_user, token
+):
+    expected_affected = 3
+    session.add_all(
+        TodoFactory.create_batch(3, user_id=user.id, state=TodoState.todo)
+    )
+    session.add_all(
+        TodoFactory.create_batch(
+            2, user_id=other_user.id, state=TodoState.todo
+        )
+    )
+    await session.commit()
+
+    response = client.patch(
+        '/todos/?state=todo',
+        json={'state': 'doing'},
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['affected'] == expected_affected
+
+
+def test_patch_todos_without_selection(client: TestClient, token):
+    response = client.patch(
+        '/todos/',
+        json={'state': 'done'},
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+@pytest.mark.asyncio
+async def test_delete_todos_empties_trash(
+    client: TestClient, session: AsyncSession, user, token, query_budget
+):
+    expected_affected = 4
+    session.add_all(
+        TodoFactory.create_batch(4, user_id=user.id, state=TodoState.trash)
+    )
+    session.add_all(
+        TodoFactory.create_batch(2, user_id=user.id, state=TodoState.done)
+    )
+    await session.commit()
+
+    with query_budget(queries=4, rows=5):
+        response = client.delete(
+            '/todos/?state=trash',
+            headers={'Authorization': f'Bearer {token}'},
+        )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['affected'] == expected_affected
+
+    response = client.get(
+        '/todos/', headers={'Authorization': f'Bearer {token}'}
+    )
+    assert {t['state'] for t in response.json()['todos']} == {'done'}
+
+
+def test_delete_todos_without_selection(client: TestClient, token):
+    response = client.delete(
+        '/todos/', headers={'Authorization': f'Bearer {token}'}
+    )
+
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('selection', ['title=', 'title=%20', 'description='])
+async def test_bulk_writes_reject_blank_filters(  # noqa: PLR0917
+    client: TestClient, session: AsyncSession, user, token, selection
+):
+    session.add_all(
+        TodoFactory.create_batch(4, user_id=user.id, state=TodoState.todo)
+    )
+    await session.commit()
+    headers = {'Authorization': f'Bearer {token}'}
+    before = client.get('/todos/', headers=headers).json()['todos']
+
+    deleted = client.delete(f'/todos/?{selection}', headers=headers)
+    patched = client.patch(
+        f'/todos/?{selection}', headers=headers, json={'state': 'done'}
+    )
+
+    assert deleted.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+    assert patched.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+    assert client.get('/todos/', headers=headers).json()['todos'] == before
+
+
+def test_selection_filters_refuse_the_owner_predicate_alone():
+    with pytest.raises(HTTPException) as error:
+        selection_filters(1, TodoSelection.model_construct())
+
+    assert error.value.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+@pytest.mark.asyncio
+async def test_export_todos_as_ndjson(
+    client: TestClient, session: AsyncSession, user, other_user, token
+):
+    todos = TodoFactory.create_batch(3, user_id=user.id)
+    session.add_all(todos)
+    session.add(TodoFactory(user_id=other_user.id))
+    await session.commit()
+
+    response = client.get(
+        '/todos/export', headers={'Authorization': f'Bearer {token}'}
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['content-type'] == 'application/x-ndjson'
+    assert 'todos.ndjson' in response.headers['content-disposition']
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line['id'] for line in lines] == [todo.id for todo in todos]
+    assert lines[0]['title'] == todos[0].title
+
+
+@pytest.mark.asyncio
+async def test_export_todos_as_csv(
+    client: TestClient, session: AsyncSession, user, token
+):
+    todos = TodoFactory.create_batch(2, user_id=user.id)
+    session.add_all(todos)
+    await session.commit()
+
+    response = client.get(
+        '/todos/export?format=csv',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['content-type'].startswith('text/csv')
+    rows = list(csv.DictReader(response.text.splitlines()))
+    assert [int(row['id']) for row in rows] == [todo.id for todo in todos]
+    assert rows[1]['state'] == todos[1].state
+
+
+def test_export_todos_rejects_unknown_format(client: TestClient, token):
+    response = client.get(
+        '/todos/export?format=xml',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+def test_import_todos_from_ndjson(client: TestClient, token):
+    expected_accepted = 2
+    body = (
+        '{"title": "a", "description": "x", "state": "todo"}\n'
+        '\n'
+        '{"title": "b", "description": "y", "state": "nope"}\n'
+        'not json\n'
+        '{"title": "c", "description": "z", "state": "done"}'
+    )
+
+    response = client.post(
+        '/todos/import',
+        content=body,
+        headers={
+            'Authorization': f'Bearer {token}',
+            'Content-Type': 'application/x-ndjson',
+        },
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    result = response.json()
+    assert result['accepted'] == expected_accepted
+    assert result['rejected'] == expected_accepted
+    assert [error['line'] for error in result['errors']] == [3, 4]
+    assert result['errors'][0]['detail'].startswith('state:')
+
+    response = client.get(
+        '/todos/', headers={'Authorization': f'Bearer {token}'}
+    )
+    assert [t['title'] for t in response.json()['todos']] == ['a', 'c']
+
+
+def test_import_todos_from_csv_in_chunks(client: TestClient, token):
+    body = (
+        'title,description,state\r\n'
+        'caf\u00e9,"two\nlines, ""quoted""",doing\r\n'
+        'short,row\r\n'
+        'plain,text,draft\r\n'
+    ).encode()
+
+    def chunks(size=7):
+        # Splits records, quoted fields and multi-byte characters.
+        for start in range(0, len(body), size):
+            yield body[start : start + size]
+
+    response = client.post(
+        '/todos/import',
+        content=chunks(),
+        headers={
+            'Authorization': f'Bearer {token}',
+            'Content-Type': 'text/csv; charset=utf-8',
+        },
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json() == {
+        'accepted': 2,
+        'rejected': 1,
+        'errors': [{'line': 4, 'detail': 'row: Expected 3 columns'}],
+    }
+
+    response = client.get(
+        '/todos/', headers={'Authorization': f'Bearer {token}'}
+    )
+    todos = response.json()['todos']
+    assert todos[0]['title'] == 'caf\u00e9'
+    assert todos[0]['description'] == 'two\nlines, "quoted"'
+
+
+def test_import_todos_from_csv_with_a_stray_quote(client: TestClient, token):
+    body = (
+        'title,description,state\n'
+        'tv,"5"" screen",todo\n'
+        'monitor,5" screen,todo\n'
+        'cable,"left open,draft\n'
+        'plain,text,draft\n'
+    )
+
+    response = client.post(
+        '/todos/import',
+        content=body,
+        headers={
+            'Authorization': f'Bearer {token}',
+            'Content-Type': 'text/csv',
+        },
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json() == {
+        'accepted': 2,
+        'rejected': 1,
+        'errors': [{'line': 4, 'detail': 'row: Unterminated quoted field'}],
+    }
+
+    response = client.get(
+        '/todos/', headers={'Authorization': f'Bearer {token}'}
+    )
+    assert [todo['description'] for todo in response.json()['todos']] == [
+        '5" screen',
+        '5" screen',
+    ]
+
+
+def test_import_todos_from_csv_with_a_large_description(
+    client: TestClient, token
+):
+    description = 'x' * 200_000  # over the csv module's default limit
+    response = client.post(
+        '/todos/import',
+        content=f'title,description,state\nbig,{description},todo\n',
+        headers={
+            'Authorization': f'Bearer {token}',
+            'Content-Type': 'text/csv',
+        },
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['accepted'] == 1
+
+
+def test_import_todos_rejects_a_line_over_the_limit(
+    client: TestClient, token, monkeypatch
+):
+    monkeypatch.setattr(importer, 'IMPORT_MAX_LINE_LENGTH', 10)
+    body = b'{"title": "a", "description": "long", "state": "todo"}'
+
+    def chunks():
+        # The line never ends, so it must not keep growing in memory.
+        yield b'\n'
+        for byte in body:
+            yield bytes([byte])
+
+    response = client.post(
+        '/todos/import',
+        content=chunks(),
+        headers={
+            'Authorization': f'Bearer {token}',
+            'Content-Type': 'application/x-ndjson',
+        },
+    )
+
+    assert response.status_code == HTTPStatus.REQUEST_ENTITY_TOO_LARGE
+    assert response.json() == {'detail': 'Line 2 is longer than 10 characters'}
+
+
+def test_import_todos_csv_error_is_a_bad_request(client: TestClient, token):
+    limit = csv.field_size_limit(len('description'))
+    try:
+        response = client.post(
+            '/todos/import',
+            content='title,description,state\na,"two\nlong lines",todo\n',
+            headers={
+                'Authorization': f'Bearer {token}',
+                'Content-Type': 'text/csv',
+            },
+        )
+    finally:
+        csv.field_size_limit(limit)
+
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert response.json()['detail'].startswith('Line 3: field larger')
+
+
+@pytest.mark.asyncio
+async def test_import_todos_commits_each_batch(
+    client: TestClient, session: AsyncSession, user, token, monkeypatch
+):
+    monkeypatch.setattr(importer, 'IMPORT_BATCH_SIZE', 2)
+    monkeypatch.setattr(importer, 'IMPORT_MAX_LINE_LENGTH', 100)
+    rows = [
+        json.dumps({'title': title, 'description': 'd', 'state': 'todo'})
+        for title in ('a', 'b', 'c', 'd', 'e', 'x' * 100)
+    ]
+
+    response = client.post(
+        '/todos/import',
+        content='\n'.join(rows),
+        headers={
+            'Authorization': f'Bearer {token}',
+            'Content-Type': 'application/x-ndjson',
+        },
+    )
+
+    assert response.status_code == HTTPStatus.REQUEST_ENTITY_TOO_LARGE
+    todos = await session.execute(
+        select(Todo.title, Todo.revision)
+        .where(Todo.user_id == user.id)
+        .order_by(Todo.id)
+    )
+    # Each full batch committed with a revision of its own before the
+    # upload failed; the unfinished third one did not.
+    assert todos.tuples().all() == [('a', 1), ('b', 1), ('c', 2), ('d', 2)]
+
+
+def test_import_todos_unsupported_media_type(client: TestClient, token):
+    response = client.post(
+        '/todos/import',
+        json=[],
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.UNSUPPORTED_MEDIA_TYPE
+
+
+async def _count_todos_by_state(session: AsyncSession, user_id: int):
+    counts = dict.fromkeys(TodoState, 0)
+    rows = await session.execute(
+        select(Todo.state, func.count())
+        .where(Todo.user_id == user_id)
+        .group_by(Todo.state)
+    )
+    counts.update(rows.tuples().all())
+
+    return counts
+
+
+@pytest.mark.asyncio
+async def test_todo_stats_follow_every_write_path(
+    client: TestClient, session: AsyncSession, user, token
+):
+    headers = {'Authorization': f'Bearer {token}'}
+
+    todo = client.post(
+        '/todos/',
+        headers=headers,
+        json={'title': 'a', 'description': 'a', 'state': 'todo'},
+    ).json()
+    client.post(
+        '/todos/bulk',
+        headers=headers,
+        json=[
+            {'title': 'b', 'description': 'b', 'state': state}
+            for state in ('todo', 'doing', 'doing', 'done')
+        ],
+    )
+    client.post(
+        '/todos/import',
+        headers={**headers, 'Content-Type': 'text/csv'},
+        content='title,description,state\nc,c,draft\nd,d,trash\n',
+    )
+    client.patch(
+        f'/todos/{todo["id"]}', headers=headers, json={'state': 'done'}
+    )
+    client.patch('/todos/?state=doing', headers=headers, json={'title': 'x'})
+    client.patch('/todos/?title=d', headers=headers, json={'state': 'draft'})
+    client.delete('/todos/?state=done', headers=headers)
+
+    response = client.get('/todos/stats', headers=headers)
+
+    assert response.status_code == HTTPStatus.OK
+    expected = await _count_todos_by_state(session, user.id)
+    assert response.json() == {
+        'by_state': {state.value: n for state, n in expected.items()},
+        'total': sum(expected.values()),
+    }
+    assert response.json()['by_state'] == {
+        'draft': 2,
+        'todo': 1,
+        'doing': 2,
+        'done': 0,
+        'trash': 0,
+    }
+
+
+@pytest.mark.asyncio
+async def test_rebuild_todo_counters(
+    client: TestClient, session: AsyncSession, user, other_user, token
+):
+    expected_doing = 3
+    # Inserted behind the router's back, so no counters yet.
+    session.add_all(
+        TodoFactory.create_batch(3, user_id=user.id, state=TodoState.doing)
+    )
+    session.add_all(TodoFactory.create_batch(2, user_id=other_user.id))
+    await session.commit()
+    headers = {'Authorization': f'Bearer {token}'}
+    assert client.get('/todos/stats', headers=headers).json()['total'] == 0
+
+    await rebuild_todo_counters(session)
+    await session.commit()
+
+    response = client.get('/todos/stats', headers=headers)
+    assert response.json()['by_state']['doing'] == expected_doing
+    assert response.json()['total'] == expected_doing
+
+
+@pytest.mark.asyncio
+async def test_list_todos_should_return_all_expected_fields(  # noqa
+    client: TestClient, session: AsyncSession, user, token, mock_db_time
+):
+    with mock_db_time(model=Todo) as time:
+        todo = TodoFactory.create(user_id=user.id)
+        session.add(todo)
+        await session.commit()
+
+        await session.refresh(todo)
+        response = client.get(
+            '/todos/',
+            headers={'Authorization': f'Bearer {token}'},
+        )
+
+        assert response.json()['todos'] == [
             {
                 'created_at': time.isoformat(),
                 'updated_at': time.isoformat(),
@@ -228,3 +1194,345 @@ async def test_list_todos_should_return_all_expected_fields(  # noqa
                 'title': todo.title,
             }
         ]
+
+
+def test_todo_changes_follow_writes_and_deletes(client: TestClient, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    todo = {'title': 't', 'description': 'd', 'state': 'todo'}
+    kept, removed = client.post(
+        '/todos/bulk',
+        headers=headers,
+        json=[
+            todo,
+            todo,
+        ],
+    ).json()
+
+    first_sync = client.get('/todos/changes', headers=headers).json()
+    assert [t['id'] for t in first_sync['todos']] == [
+        kept['id'],
+        removed['id'],
+    ]
+    assert first_sync['deleted'] == []
+    assert first_sync['has_more'] is False
+
+    client.patch(
+        f'/todos/{kept["id"]}', headers=headers, json={'state': 'done'}
+    )
+    client.delete(f'/todos/{removed["id"]}', headers=headers)
+
+    response = client.get(
+        f'/todos/changes?since={first_sync["next_since"]}', headers=headers
+    )
+    changes = response.json()
+    assert [(t['id'], t['state']) for t in changes['todos']] == [
+        (kept['id'], 'done')
+    ]
+    assert changes['deleted'] == [removed['id']]
+
+    response = client.get(
+        f'/todos/changes?since={changes["next_since"]}', headers=headers
+    )
+    assert response.json() == {**changes, 'todos': [], 'deleted': []}
+
+
+def test_todo_changes_pages_with_has_more(client: TestClient, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    todo = {'title': 't', 'description': 'd', 'state': 'todo'}
+    expected_ids = [
+        client.post('/todos/', headers=headers, json=todo).json()['id']
+        for _ in range(3)
+    ]
+
+    ids, since, has_more = [], '', True
+    while has_more:
+        changes = client.get(
+            f'/todos/changes?limit=2&since={since}', headers=headers
+        ).json()
+        ids += [todo['id'] for todo in changes['todos']]
+        since, has_more = changes['next_since'], changes['has_more']
+
+    assert ids == expected_ids
+
+
+def test_todo_changes_rejects_a_limit_over_the_page_size(
+    client: TestClient, token
+):
+    response = client.get(
+        f'/todos/changes?limit={PAGE_MAX_LIMIT + 1}',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+def test_todo_changes_rejects_an_invalid_token(client: TestClient, token):
+    response = client.get(
+        '/todos/changes?since=not-a-token',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert response.json() == {'detail': 'Invalid cursor'}
+
+
+@pytest.mark.asyncio
+async def test_stream_sends_changes_asserver_sent_events(
+    session: AsyncSession, user, monkeypatch
+):
+    monkeypatch.setattr(settings, 'TODO_STREAM_KEEPALIVE_SECONDS', 0.01)
+
+    @asynccontextmanager
+    async def session_factory():
+        yield session
+
+    broker = MemoryBroker()
+    token = create_access_token(user_claims(user))
+    since = await stream_start(session_factory, user.id, None)
+    events = server_sent_events(
+        todo_change_events(broker, session_factory, user.id, since, token)
+    )
+    assert await events.__anext__() == ': keepalive\n\n'
+
+    todo = TodoFactory(user_id=user.id, revision=1)
+    session.add(todo)
+    await session.commit()
+    await broker.publish(user.id)
+
+    event = await events.__anext__()
+    event_id, event_type, data = event.strip().split('\n')
+    await events.aclose()
+
+    changes = json.loads(data.removeprefix('data: '))
+    assert event_type == 'event: changes'
+    assert event_id == f'id: {changes["next_since"]}'
+    assert [t['id'] for t in changes['todos']] == [todo.id]
+
+
+@pytest.mark.asyncio
+async def test_stream_ends_once_the_token_is_revoked(
+    session: AsyncSession, user, monkeypatch
+):
+    monkeypatch.setattr(settings, 'TODO_STREAM_KEEPALIVE_SECONDS', 0.01)
+
+    @asynccontextmanager
+    async def session_factory():
+        yield session
+
+    token = create_access_token(user_claims(user))
+    since = await stream_start(session_factory, user.id, None)
+    events = todo_change_events(
+        MemoryBroker(), session_factory, user.id, since, token
+    )
+    keepalive = await events.__anext__()
+    assert keepalive.todos == []
+
+    remember_token_version(user.id, user.token_version + 1)
+
+    with pytest.raises(StopAsyncIteration):
+        await events.__anext__()
+
+
+@pytest.mark.asyncio
+async def test_stream_of_a_busy_account_ends_once_the_token_is_revoked(
+    session: AsyncSession, user, monkeypatch
+):
+    # Writes arrive well within every keepalive interval.
+    monkeypatch.setattr(settings, 'TODO_STREAM_KEEPALIVE_SECONDS', 60)
+
+    @asynccontextmanager
+    async def session_factory():
+        yield session
+
+    broker = MemoryBroker()
+    token = create_access_token(user_claims(user))
+    since = await stream_start(session_factory, user.id, None)
+    events = todo_change_events(broker, session_factory, user.id, since, token)
+
+    async def write(revision):
+        session.add(TodoFactory(user_id=user.id, revision=revision))
+        await session.commit()
+        await broker.publish(user.id)
+
+    await write(1)
+    changes = await events.__anext__()
+    assert changes.todos
+
+    remember_token_version(user.id, user.token_version + 1)
+    await write(2)
+
+    with pytest.raises(StopAsyncIteration):
+        await events.__anext__()
+
+
+def test_stream_rejects_an_invalid_token(client: TestClient, token):
+    response = client.get(
+        '/todos/stream?since=not-a-token',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+
+
+def test_todo_changes_socket_pushes_writes(
+    client: TestClient, token, monkeypatch
+):
+    monkeypatch.setattr(settings, 'TODO_STREAM_KEEPALIVE_SECONDS', 0.05)
+    headers = {'Authorization': f'Bearer {token}'}
+
+    with client.websocket_connect(f'/todos/ws?token={token}') as websocket:
+        todo = client.post(
+            '/todos/',
+            headers=headers,
+            json={'title': 't', 'description': 'd', 'state': 'todo'},
+        ).json()
+
+        changes = websocket.receive_json()
+        while not changes['todos']:  # keepalives
+            changes = websocket.receive_json()
+
+    assert changes['todos'] == [todo]
+    assert changes['deleted'] == []
+
+
+def test_todo_changes_socket_closes_once_the_token_is_revoked(
+    client: TestClient, user, token, monkeypatch
+):
+    monkeypatch.setattr(settings, 'TODO_STREAM_KEEPALIVE_SECONDS', 0.01)
+
+    with client.websocket_connect(f'/todos/ws?token={token}') as websocket:
+        websocket.receive_json()
+        remember_token_version(user.id, user.token_version + 1)
+
+        try:
+            while True:  # keepalives sent before the revocation was seen
+                websocket.receive_json()
+        except WebSocketDisconnect as disconnect:
+            code = disconnect.code
+
+    assert code == status.WS_1008_POLICY_VIOLATION
+
+
+def test_todo_changes_socket_requires_a_valid_token(client: TestClient):
+    with pytest.raises(WebSocketDisconnect):
+        with client.websocket_connect('/todos/ws?token=bad') as websocket:
+            websocket.receive_json()
+
+
+def test_create_todo_rejects_titles_too_long_to_index(
+    client: TestClient, token
+):
+    response = client.post(
+        '/todos/',
+        headers={'Authorization': f'Bearer {token}'},
+        json={
+            'title': 'x' * (TITLE_MAX_LENGTH + 1),
+            'description': 'd',
+            'state': 'todo',
+        },
+    )
+
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+@pytest.mark.asyncio
+async def test_todos_with_titles_from_before_the_limit_are_still_served(
+    client: TestClient, session: AsyncSession, user, token
+):
+    legacy_title = 'x' * (TITLE_MAX_LENGTH * 2)
+    todo = TodoFactory(user_id=user.id, title=legacy_title)
+    short = TodoFactory(user_id=user.id, title='y')
+    session.add_all([todo, short])
+    await session.commit()
+    headers = {'Authorization': f'Bearer {token}'}
+
+    response = client.patch(
+        f'/todos/{todo.id}', headers=headers, json={'state': 'done'}
+    )
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['title'] == legacy_title
+
+    response = client.get('/todos/changes', headers=headers)
+    assert response.status_code == HTTPStatus.OK
+
+    response = client.get('/todos/export?format=csv', headers=headers)
+    assert response.status_code == HTTPStatus.OK
+
+    response = client.get('/todos/?order_by=title&limit=1', headers=headers)
+    assert response.json()['todos'][0]['title'] == legacy_title
+    response = client.get(
+        f'/todos/?order_by=title&cursor={response.json()["next_cursor"]}',
+        headers=headers,
+    )
+    assert [t['id'] for t in response.json()['todos']] == [short.id]
+
+
+@pytest.fixture
+def three_todos(client: TestClient, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    for state in ('todo', 'todo', 'done'):
+        client.post(
+            '/todos/',
+            headers=headers,
+            json={'title': 'milk', 'description': 'd', 'state': state},
+        )
+
+    return headers
+
+
+def test_list_todos_total_exact_is_capped(
+    client: TestClient, three_todos, monkeypatch
+):
+    expected_total = 3
+    response = client.get('/todos/?include_total=exact', headers=three_todos)
+    assert response.json()['total'] == {
+        'value': expected_total,
+        'strategy': 'exact',
+        'capped': False,
+    }
+
+    monkeypatch.setattr('fast_zero.totals.settings.TOTAL_EXACT_CAP', 2)
+    response = client.get('/todos/?include_total=exact', headers=three_todos)
+    assert response.json()['total'] == {
+        'value': 2,
+        'strategy': 'exact',
+        'capped': True,
+    }
+
+
+def test_list_todos_total_cached_reads_the_counters(
+    client: TestClient, three_todos, query_budget
+):
+    expected_total = 2
+
+    with query_budget(queries=3, rows=5):
+        response = client.get(
+            '/todos/?state=todo&include_total=cached', headers=three_todos
+        )
+
+    assert response.json()['total'] == {
+        'value': expected_total,
+        'strategy': 'cached',
+        'capped': False,
+    }
+
+    # No counter per title: falls back to an exact count.
+    response = client.get(
+        '/todos/?title=milk&include_total=cached', headers=three_todos
+    )
+    assert response.json()['total']['strategy'] == 'exact'
+
+
+@pytest.mark.asyncio
+async def test_list_todos_total_estimate(
+    client: TestClient, session: AsyncSession, three_todos
+):
+    response = client.get(
+        '/todos/?include_total=estimate', headers=three_todos
+    )
+
+    expected_strategy = (
+        'estimate' if session.bind.dialect.name == 'postgresql' else 'exact'
+    )
+    assert response.json()['total']['strategy'] == expected_strategy
+    assert response.json()['total']['value'] >= 0
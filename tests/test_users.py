@@ -1,8 +1,13 @@
 from http import HTTPStatus
 
+import pytest
 from fastapi.testclient import TestClient
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from fast_zero.schemas import UserPublic
+from fast_zero.models import Todo, TodoCounter
+from fast_zero.schemas import UserPublic, UserRow
+from tests.factories import TodoFactory
 
 
 def test_create_user(client: TestClient):
@@ -22,6 +27,21 @@ def test_create_user(client: TestClient):
     }
 
 
+def test_create_user_query_budget(client: TestClient, query_budget):
+    # A single INSERT ... RETURNING: uniqueness is the constraints' job.
+    with query_budget(queries=1, rows=0):
+        response = client.post(
+            '/users/',
+            json={
+                'username': 'neville',
+                'email': 'neville@example.com',
+                'password': 'thisismypassword',
+            },
+        )
+
+    assert response.status_code == HTTPStatus.CREATED
+
+
 def test_create_user_error_username_conflict(client: TestClient, user):
     payload = {
         'username': user.username,
@@ -46,6 +66,20 @@ def test_create_user_error_email_conflict(client: TestClient, user):
     assert response.json() == {'detail': 'Email already exists'}
 
 
+def test_create_user_error_email_conflict_ignores_case(
+    client: TestClient, user
+):
+    payload = {
+        'username': 'neville',
+        'email': user.email.upper(),
+        'password': 'thisismypassword',
+    }
+    response = client.post('/users/', json=payload)
+
+    assert response.status_code == HTTPStatus.CONFLICT
+    assert response.json() == {'detail': 'Email already exists'}
+
+
 def test_read_users_with_users(client: TestClient, user, token):
     user_schema = UserPublic.model_validate(user).model_dump()
     response = client.get(
@@ -53,7 +87,91 @@ def test_read_users_with_users(client: TestClient, user, token):
     )
 
     assert response.status_code == HTTPStatus.OK
-    assert response.json() == {'users': [user_schema]}
+    assert response.json() == {'users': [user_schema], 'next_cursor': None}
+
+
+def test_read_users_cursor_pagination(
+    client: TestClient, user, other_user, token
+):
+    response = client.get(
+        '/users/?limit=1', headers={'Authorization': f'Bearer {token}'}
+    )
+    first_page = response.json()
+
+    assert [u['id'] for u in first_page['users']] == [user.id]
+    assert first_page['next_cursor'] is not None
+
+    response = client.get(
+        f'/users/?limit=1&cursor={first_page["next_cursor"]}',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.json() == {
+        'users': [UserPublic.model_validate(other_user).model_dump()],
+        'next_cursor': None,
+    }
+
+
+@pytest.mark.asyncio
+async def test_read_users_query_budget(  # noqa: PLR0913, PLR0917
+    client: TestClient,
+    session: AsyncSession,
+    user,
+    other_user,
+    token,
+    query_budget,
+):
+    session.add_all(TodoFactory.create_batch(5, user_id=user.id))
+    session.add_all(TodoFactory.create_batch(5, user_id=other_user.id))
+    await session.commit()
+
+    with query_budget(queries=2, rows=3):
+        response = client.get(
+            '/users/', headers={'Authorization': f'Bearer {token}'}
+        )
+
+    assert response.status_code == HTTPStatus.OK
+
+
+def test_read_users_with_fields(client: TestClient, user, token):
+    response = client.get(
+        '/users/?fields=username',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.json()['users'] == [
+        {'id': user.id, 'username': user.username}
+    ]
+
+
+def test_read_users_rejects_unknown_fields(client: TestClient, token):
+    response = client.get(
+        '/users/?fields=username,password',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.BAD_REQUEST
+    assert response.json() == {'detail': 'Unknown fields: password'}
+
+
+def test_read_users_include_total(client: TestClient, user, other_user, token):
+    expected_total = 2
+
+    response = client.get(
+        '/users/?limit=1&include_total=cached',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert len(response.json()['users']) == 1
+    assert response.json()['total'] == {
+        'value': expected_total,
+        'strategy': 'exact',
+        'capped': False,
+    }
+
+
+def test_user_row_matches_user_public():
+    assert UserRow.__annotations__.keys() == UserPublic.model_fields.keys()
 
 
 def test_read_user_by_id(client: TestClient, user, token):
@@ -66,6 +184,55 @@ def test_read_user_by_id(client: TestClient, user, token):
     assert response.json() == user_schema
 
 
+@pytest.mark.asyncio
+async def test_read_user_by_id_query_budget(
+    client: TestClient, session: AsyncSession, user, token, query_budget
+):
+    session.add_all(TodoFactory.create_batch(5, user_id=user.id))
+    await session.commit()
+
+    with query_budget(queries=2, rows=2):
+        response = client.get(
+            f'/users/{user.id}', headers={'Authorization': f'Bearer {token}'}
+        )
+
+    assert response.status_code == HTTPStatus.OK
+
+
+def test_read_user_by_id_not_modified(client: TestClient, user, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    etag = client.get(f'/users/{user.id}', headers=headers).headers['etag']
+
+    response = client.get(
+        f'/users/{user.id}', headers={**headers, 'If-None-Match': etag}
+    )
+
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+    assert response.headers['cache-control'] == 'private, no-cache'
+
+    client.put(
+        f'/users/{user.id}',
+        headers=headers,
+        json={
+            'username': 'renamed',
+            'email': user.email,
+            'password': 'newpassword',
+        },
+    )
+    token = client.post(
+        '/auth/token',
+        data={'username': 'renamed', 'password': 'newpassword'},
+    ).json()['access_token']
+
+    response = client.get(
+        f'/users/{user.id}',
+        headers={'Authorization': f'Bearer {token}', 'If-None-Match': etag},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['username'] == 'renamed'
+
+
 def test_read_user_by_id_error_not_found(client: TestClient, token):
     response = client.get(
         '/users/999', headers={'Authorization': f'Bearer {token}'}
@@ -94,6 +261,24 @@ def test_update_user(client: TestClient, user, token):
     }
 
 
+def test_update_user_query_budget(
+    client: TestClient, user, token, query_budget
+):
+    # Token owner and UPDATE ... RETURNING.
+    with query_budget(queries=2, rows=1):
+        response = client.put(
+            f'/users/{user.id}',
+            json={
+                'username': 'test2',
+                'email': 'test2@example.com',
+                'password': 'thisismypassword',
+            },
+            headers={'Authorization': f'Bearer {token}'},
+        )
+
+    assert response.status_code == HTTPStatus.OK
+
+
 def test_update_user_error_username_conflict(
     client: TestClient, user, other_user, token
 ):
@@ -152,6 +337,37 @@ def test_delete_user(client: TestClient, user, token):
     assert response.json() == {'message': 'User deleted'}
 
 
+@pytest.mark.asyncio
+async def test_delete_user_cascades_in_the_database(  # noqa: PLR0913, PLR0917
+    client: TestClient,
+    session: AsyncSession,
+    user,
+    other_user,
+    token,
+    query_budget,
+):
+    headers = {'Authorization': f'Bearer {token}'}
+    client.post(
+        '/todos/bulk',
+        headers=headers,
+        json=[{'title': 't', 'description': 'd', 'state': 'todo'}] * 50,
+    )
+    session.add(TodoFactory(user_id=other_user.id))
+    await session.commit()
+
+    # The token owner and one DELETE, however many todos there are.
+    with query_budget(queries=2, rows=1):
+        response = client.delete(f'/users/{user.id}', headers=headers)
+
+    assert response.status_code == HTTPStatus.OK
+    todos = await session.scalars(select(Todo.user_id))
+    assert todos.all() == [other_user.id]
+    counters = await session.scalar(
+        select(func.count()).select_from(TodoCounter)
+    )
+    assert counters == 0
+
+
 def test_delete_user_with_wrong_user(client: TestClient, other_user, token):
     response = client.delete(
         f'/users/{other_user.id}', headers={'Authorization': f'Bearer {token}'}